@@ -6,25 +6,962 @@ import platform
 import patoolib
 import threading
 import time
+import queue
+import re
+import json
+import hashlib
+import sqlite3
+import gzip
+import io
+import shutil
+import tempfile
+import zipfile
+import zlib
+import multiprocessing
+import array
+import wave
+import socket
+import struct
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QProgressBar, QFileDialog, QTextEdit,
                              QFrame, QGridLayout, QSplashScreen, QDockWidget, QToolBar, QListWidget,
-                             QDialog, QComboBox, QScrollArea, QInputDialog)
+                             QDialog, QComboBox, QScrollArea, QInputDialog, QListWidgetItem, QCheckBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap, QFont
 
+def command_device(command):
+    cmd = command[0] if isinstance(command[0], list) else command
+    return cmd[cmd.index("-s") + 1] if "-s" in cmd else ""
+
+# the socket lives in a directory only its owner can write, so nobody else can squat the path; other users
+# share a broker by pointing ADBSPLOIT_BROKER at the owner's socket (tempfile.gettempdir() is per-user on macOS)
+BROKER_SOCKET = os.environ.get("ADBSPLOIT_BROKER", os.path.join("/tmp" if os.name == "posix" else tempfile.gettempdir(),
+                                                                f"adbsploit-{os.getuid()}" if hasattr(os, "getuid") else "adbsploit",
+                                                                "broker.sock"))
+_broker_client = None  # set when a shared adb broker is reachable
+
+def peer_uid(conn):
+    # uid of the process at the other end of a Unix socket, or None when the platform cannot tell
+    try:
+        if hasattr(socket, "SO_PEERCRED"):
+            return struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))[1]
+        if sys.platform == "darwin":
+            # SOL_LOCAL / LOCAL_PEERCRED fill a struct xucred {u_int cr_version; uid_t cr_uid; ...}
+            return struct.unpack_from("2I", conn.getsockopt(0, 0x001, 76))[1]
+    except OSError:
+        pass
+    return None
+
+def adb_run(cmd, check=False, timeout=None):
+    # commands that name host paths run in this process when the broker would refuse them for another user
+    if _broker_client is not None and (_broker_client.trusted or AdbBroker.peer_allowed(cmd[1:])):
+        try:
+            result = _broker_client.run(cmd[1:], timeout)
+        except OSError:
+            result = None
+        if result is not None:
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+            return result
+    return subprocess.run(cmd, check=check, capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=timeout)
+
+class AdbBroker:
+    CACHE_TTL = 2.0
+    MAX_WORKERS = 16
+    # adb commands that never change device state; duplicates are coalesced and cached. Matched exactly, since
+    # e.g. `dumpsys battery set level 5` or `ip addr add ...` start like a read but change state
+    READ_ONLY = {("devices",), ("devices", "-l"), ("get-state",), ("get-serialno",), ("shell", "dumpsys", "battery"),
+                 ("shell", "dumpsys", "location"), ("shell", "dumpsys", "meminfo"), ("shell", "ip", "addr"), ("shell", "ip", "addr", "show")}
+    # reads that take further arguments, as long as each one is a plain token and cannot smuggle in shell syntax
+    READ_ONLY_PREFIXES = [("shell", "getprop"), ("shell", "pm", "list")]
+    PLAIN_ARG_RE = re.compile(r"^[\w.:/=,+-]+$")
+    # what other users may run through the broker: commands that only touch the device. push, pull, install,
+    # connect, forward, ... name host paths or change host state and would run as the broker's owner
+    PEER_COMMANDS = {"devices", "get-state", "get-serialno", "shell", "exec-out", "logcat", "reboot", "root", "unroot"}
+
+    def __init__(self, adb_path, socket_path=BROKER_SOCKET):
+        self.adb_path = adb_path
+        self.socket_path = socket_path
+        self.pool = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+        self.lock = threading.Lock()
+        self.cache = {}     # args -> (expires, CompletedProcess)
+        self.inflight = {}  # args -> (Future, generation)
+        self.generation = 0  # bumped on every invalidation so in-flight reads started earlier are not cached
+        self.leases = {}    # serial -> client id
+
+    @staticmethod
+    def _serial(args):
+        return args[args.index("-s") + 1] if "-s" in args and args.index("-s") + 1 < len(args) else None
+
+    def _is_read_only(self, args):
+        command = tuple(args[2:] if args[:1] == ["-s"] else args)
+        if command in self.READ_ONLY:
+            return True
+        return any(command[:len(prefix)] == prefix and all(self.PLAIN_ARG_RE.match(arg) for arg in command[len(prefix):])
+                   for prefix in self.READ_ONLY_PREFIXES)
+
+    def _invalidate(self, serial):
+        # a command without -s (connect, disconnect, kill-server, ...) may affect any device
+        with self.lock:
+            self.generation += 1
+            for key in list(self.cache):
+                if serial is None or self._serial(list(key)) in (serial, None):
+                    del self.cache[key]
+
+    @classmethod
+    def peer_allowed(cls, args):
+        command = args[2:] if args[:1] == ["-s"] else args
+        return bool(command) and command[0] in cls.PEER_COMMANDS
+
+    def _execute(self, args, timeout):
+        return subprocess.run([self.adb_path] + args, capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=timeout)
+
+    def run(self, client, args, timeout=None, trusted=True):
+        if not trusted and not self.peer_allowed(args):
+            return {"ok": False, "error": f"Only the broker's owner may run '{' '.join(args)}' through it"}
+        serial = self._serial(args)
+        if not self._is_read_only(args):
+            with self.lock:
+                owner = self.leases.get(serial)
+            if serial and owner not in (None, client):
+                return {"ok": False, "error": f"Device {serial} is leased by another operator"}
+            try:
+                return self._reply(self.pool.submit(self._execute, args, timeout).result())
+            finally:
+                self._invalidate(serial)
+        key = tuple(args)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return self._reply(cached[1], cached=True)
+            if key not in self.inflight:
+                self.inflight[key] = (self.pool.submit(self._execute, args, timeout), self.generation)
+            entry = self.inflight[key]
+        future, generation = entry
+        try:
+            result = future.result()
+        finally:
+            with self.lock:
+                if self.inflight.get(key) is entry:
+                    del self.inflight[key]
+                    if future.exception() is None and generation == self.generation:
+                        self.cache[key] = (time.monotonic() + self.CACHE_TTL, future.result())
+        return self._reply(result)
+
+    @staticmethod
+    def _reply(result, cached=False):
+        return {"ok": True, "returncode": result.returncode, "stdout": result.stdout, "stderr": result.stderr, "cached": cached}
+
+    def lease(self, client, serial):
+        with self.lock:
+            owner = self.leases.setdefault(serial, client)
+        return {"ok": owner == client, "error": None if owner == client else f"Device {serial} is leased by another operator"}
+
+    def release(self, client, serial=None):
+        with self.lock:
+            for leased, owner in list(self.leases.items()):
+                if owner == client and serial in (None, leased):
+                    del self.leases[leased]
+        return {"ok": True}
+
+    def restart(self, client):
+        with self.lock:
+            others = sorted(serial for serial, owner in self.leases.items() if owner != client)
+        if others:
+            return {"ok": False, "error": f"Other operators hold leases on {', '.join(others)}; not restarting the adb server"}
+        self._execute(["kill-server"], 30)
+        result = self._execute(["start-server"], 30)
+        with self.lock:
+            self.cache.clear()
+        return self._reply(result)
+
+    def handle(self, conn):
+        name, client, control = None, None, False
+        uid = peer_uid(conn)
+        trusted = uid == os.getuid()
+        with conn, conn.makefile('rwb') as stream:
+            try:
+                for line in stream:
+                    request = json.loads(line)
+                    name = request.get("client", name)
+                    client = f"{uid}/{name}"  # scoped by uid so other users cannot claim a lease
+                    op = request.get("op")
+                    control = control or op != "run"
+                    try:
+                        if op == "run":
+                            reply = self.run(client, request["args"], request.get("timeout"), trusted)
+                        elif op == "lease":
+                            reply = self.lease(client, request["serial"])
+                        elif op == "release":
+                            reply = self.release(client, request.get("serial"))
+                        elif op == "restart":
+                            reply = self.restart(client)
+                        elif op == "hello":
+                            reply = {"ok": True, "trusted": trusted}
+                        else:
+                            reply = {"ok": False, "error": f"Unknown op: {op}"}
+                    except Exception as e:
+                        reply = {"ok": False, "error": str(e)}
+                    stream.write((json.dumps(reply) + "\n").encode('utf-8'))
+                    stream.flush()
+            except (OSError, ValueError):
+                pass
+            finally:
+                if control and client is not None:
+                    self.release(client)
+
+    def serve(self):
+        socket_dir = os.path.dirname(self.socket_path)
+        os.makedirs(socket_dir, mode=0o755, exist_ok=True)
+        info = os.stat(socket_dir)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise RuntimeError(f"{socket_dir} must be owned by you and not writable by others")
+        if os.path.exists(self.socket_path):
+            try:
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                probe.connect(self.socket_path)
+                probe.close()
+                raise RuntimeError(f"A broker is already listening on {self.socket_path}")
+            except ConnectionRefusedError:
+                os.remove(self.socket_path)
+        self._execute(["start-server"], 30)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o666)  # other users may connect; run() limits them to PEER_COMMANDS
+        server.listen()
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+class BrokerClient:
+    def __init__(self, socket_path=BROKER_SOCKET):
+        self.socket_path = socket_path
+        self.client = f"{platform.node()}-{os.getpid()}"
+        info = os.stat(os.path.dirname(socket_path))
+        if info.st_mode & 0o022:
+            raise PermissionError(f"{os.path.dirname(socket_path)} is writable by others; refusing to trust its broker")
+        self.control = self._connect()  # leases live as long as this connection
+        owner = peer_uid(self.control)
+        if owner is not None and owner != info.st_uid:
+            self.control.close()
+            raise PermissionError(f"Broker at {socket_path} is not run by the owner of its directory")
+        self.control_lock = threading.Lock()
+        self.trusted = self._request(self.control, {"op": "hello"}, self.control_lock).get("trusted", False)
+
+    def _connect(self):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.socket_path)
+        return conn
+
+    def _request(self, conn, request, lock=None):
+        request["client"] = self.client
+        with lock or threading.Lock():
+            conn.sendall((json.dumps(request) + "\n").encode('utf-8'))
+            reply = b""
+            while not reply.endswith(b"\n"):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    raise ConnectionError("Broker closed the connection")
+                reply += chunk
+        return json.loads(reply)
+
+    def run(self, args, timeout=None):
+        with self._connect() as conn:
+            reply = self._request(conn, {"op": "run", "args": list(args), "timeout": timeout})
+        if not reply["ok"]:
+            return subprocess.CompletedProcess(["adb"] + list(args), 1, "", reply["error"])
+        return subprocess.CompletedProcess(["adb"] + list(args), reply["returncode"], reply["stdout"], reply["stderr"])
+
+    def lease(self, serial):
+        return self._request(self.control, {"op": "lease", "serial": serial}, self.control_lock)
+
+    def release(self, serial=None):
+        return self._request(self.control, {"op": "release", "serial": serial}, self.control_lock)
+
+    def restart(self):
+        return self._request(self.control, {"op": "restart"}, self.control_lock)
+
+    def close(self):
+        self.control.close()
+
+@dataclass
+class BatteryState:
+    level: int = None
+    scale: int = None
+    status: str = None
+    health: str = None
+    temperature_c: float = None
+    voltage_mv: int = None
+    technology: str = None
+    present: bool = None
+    plugged: list = field(default_factory=list)
+    extras: dict = field(default_factory=dict)
+
+@dataclass
+class LocationFix:
+    provider: str
+    latitude: float
+    longitude: float
+    accuracy_m: float = None
+    altitude_m: float = None
+
+@dataclass
+class LocationState:
+    providers: list = field(default_factory=list)
+    fixes: list = field(default_factory=list)
+
+@dataclass
+class ProcessMemory:
+    name: str
+    pid: int
+    pss_kb: int
+
+@dataclass
+class MemInfo:
+    total_ram_kb: int = None
+    free_ram_kb: int = None
+    used_ram_kb: int = None
+    lost_ram_kb: int = None
+    processes: list = field(default_factory=list)
+
+@dataclass
+class PackageInfo:
+    name: str
+    version_code: int = None
+    version_name: str = None
+    min_sdk: int = None
+    target_sdk: int = None
+    code_path: str = None
+    first_install: str = None
+    last_update: str = None
+    requested_permissions: list = field(default_factory=list)
+    granted_permissions: dict = field(default_factory=dict)  # permission -> granted
+
+BATTERY_STATUS = {"1": "unknown", "2": "charging", "3": "discharging", "4": "not charging", "5": "full"}
+BATTERY_HEALTH = {"1": "unknown", "2": "good", "3": "overheat", "4": "dead", "5": "over voltage", "6": "failure", "7": "cold"}
+LOCATION_RE = re.compile(r"Location\[(\w+) (-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)([^\]]*)\]")
+PSS_RE = re.compile(r"^\s*([\d,]+)K: (.+?) \(pid (\d+)")
+RAM_RE = re.compile(r"^\s*(Total|Free|Used|Lost) RAM:\s*(-?[\d,]+)K")
+PACKAGE_POOL_THRESHOLD = 200  # package sections before parsing moves to a process pool
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+_package_pool = None  # shared ProcessPoolExecutor, created on the first large package dump
+_package_pool_lock = threading.Lock()
+
+def iter_lines(text):
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        yield text[start:end].rstrip("\r")
+        start = end + 1
+
+def _kb(value):
+    return int(value.replace(",", ""))
+
+def parse_battery(lines):
+    state = BatteryState()
+    for line in lines:
+        if ":" not in line or not line.startswith("  "):
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        if key.endswith(" powered"):
+            if value == "true":
+                state.plugged.append(key[:-len(" powered")].lower())
+        elif key in ("level", "scale"):
+            setattr(state, key, int(value))
+        elif key == "status":
+            state.status = BATTERY_STATUS.get(value, value)
+        elif key == "health":
+            state.health = BATTERY_HEALTH.get(value, value)
+        elif key == "temperature":
+            state.temperature_c = int(value) / 10
+        elif key == "voltage":
+            state.voltage_mv = int(value)
+        elif key == "technology":
+            state.technology = value
+        elif key == "present":
+            state.present = value == "true"
+        else:
+            state.extras[key] = value
+    return state
+
+def parse_location(lines):
+    state = LocationState()
+    seen = set()
+    for line in lines:
+        stripped = line.strip()
+        if stripped.endswith(" provider:") and " " not in stripped[:-len(" provider:")]:
+            provider = stripped[:-len(" provider:")]
+            if provider not in state.providers:
+                state.providers.append(provider)
+        for match in LOCATION_RE.finditer(line):
+            if match.group(0) in seen:
+                continue
+            seen.add(match.group(0))
+            fix = LocationFix(match.group(1), float(match.group(2)), float(match.group(3)))
+            for attr in match.group(4).split():
+                key, _, value = attr.partition("=")
+                try:
+                    if key in ("hAcc", "acc"):
+                        fix.accuracy_m = float(value)
+                    elif key == "alt":
+                        fix.altitude_m = float(value)
+                except ValueError:
+                    pass
+            state.fixes.append(fix)
+    return state
+
+def parse_meminfo(lines):
+    info = MemInfo()
+    in_pss = False
+    for line in lines:
+        if line.startswith("Total PSS by process"):
+            in_pss = True
+            continue
+        if in_pss:
+            match = PSS_RE.match(line)
+            if match:
+                info.processes.append(ProcessMemory(match.group(2), int(match.group(3)), _kb(match.group(1))))
+                continue
+            if line.strip():
+                in_pss = False
+        match = RAM_RE.match(line)
+        if match:
+            setattr(info, f"{match.group(1).lower()}_ram_kb", _kb(match.group(2)))
+    return info
+
+def _parse_package_section(lines):
+    package = PackageInfo(lines[0].split("[", 1)[1].split("]", 1)[0])
+    section = None
+    for line in lines[1:]:
+        stripped = line.strip()
+        if stripped.endswith("permissions:"):
+            section = "requested" if stripped == "requested permissions:" else "granted"
+            continue
+        if section and line.startswith("      ") and "=" not in stripped.split(":", 1)[0]:
+            name, _, rest = stripped.partition(":")
+            if section == "requested":
+                package.requested_permissions.append(name)
+            elif "granted=" in rest:
+                package.granted_permissions[name] = "granted=true" in rest
+            continue
+        section = None
+        for attr in stripped.split():
+            key, _, value = attr.partition("=")
+            if key == "versionCode":
+                package.version_code = int(value) if value.isdigit() else value
+            elif key == "versionName":
+                package.version_name = value
+            elif key in ("minSdk", "targetSdk"):
+                setattr(package, "min_sdk" if key == "minSdk" else "target_sdk", int(value) if value.isdigit() else value)
+            elif key == "codePath":
+                package.code_path = value
+        if stripped.startswith("firstInstallTime="):
+            package.first_install = stripped.split("=", 1)[1]
+        elif stripped.startswith("lastUpdateTime="):
+            package.last_update = stripped.split("=", 1)[1]
+    return package
+
+def parse_packages(lines):
+    sections, current, in_packages = [], None, False
+    for line in lines:
+        if line == "Packages:":
+            in_packages = True
+        elif in_packages and line.startswith("  Package ["):
+            current = [line]
+            sections.append(current)
+        elif in_packages and line and not line.startswith(" "):
+            in_packages, current = False, None
+        elif current is not None:
+            current.append(line)
+    if len(sections) >= PACKAGE_POOL_THRESHOLD:
+        return list(package_pool().map(_parse_package_section, sections, chunksize=32))
+    return [_parse_package_section(section) for section in sections]
+
+def package_pool():
+    global _package_pool
+    with _package_pool_lock:
+        if _package_pool is None:
+            _package_pool = ProcessPoolExecutor()
+        return _package_pool
+
+def shutdown_package_pool():
+    global _package_pool
+    with _package_pool_lock:
+        if _package_pool is not None:
+            _package_pool.shutdown(wait=False, cancel_futures=True)
+            _package_pool = None
+
+DUMPSYS_PARSERS = {"battery": parse_battery, "location": parse_location, "meminfo": parse_meminfo, "package": parse_packages}
+
+def parse_dumpsys(kind, text):
+    digest = hashlib.blake2b(digest_size=16)
+    for line in iter_lines(text):
+        digest.update(line.encode('utf-8', errors='replace'))
+        digest.update(b"\n")
+    key = (kind, digest.digest())
+    with _parse_cache_lock:
+        if key in _parse_cache:
+            _parse_cache.move_to_end(key)
+            return _parse_cache[key]
+    record = DUMPSYS_PARSERS[kind](iter_lines(text))
+    with _parse_cache_lock:
+        _parse_cache[key] = record
+        if len(_parse_cache) > 32:
+            _parse_cache.popitem(last=False)
+    return record
+
+def format_record(record):
+    if isinstance(record, list):
+        return json.dumps([asdict(item) for item in record], indent=2)
+    return json.dumps(asdict(record), indent=2)
+
+class ArtifactStore:
+    DEFAULT_CONFIG = {"max_bytes": 2 * 1024 ** 3, "retention_days": 30}
+
+    def __init__(self, root, on_evict=None):
+        self.root = root
+        self.on_evict = on_evict  # called with each evicted record's name, action and device
+        self.blob_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.db_path = os.path.join(root, "index.db")
+        self.lock = threading.Lock()
+        self.config = dict(self.DEFAULT_CONFIG)
+        try:
+            with open(os.path.join(root, "config.json"), encoding='utf-8') as f:
+                self.config.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, stored_size INTEGER, compressed INTEGER)")
+            db.execute("CREATE TABLE IF NOT EXISTS artifacts (id INTEGER PRIMARY KEY, sha256 TEXT, device TEXT, action TEXT, name TEXT, created REAL, size INTEGER)")
+            db.execute("CREATE INDEX IF NOT EXISTS artifacts_action ON artifacts (action, created)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def blob_path(self, sha256, compressed):
+        return os.path.join(self.blob_dir, sha256[:2], sha256 + (".gz" if compressed else ""))
+
+    def put_stream(self, stream, device, action, name, compress=False, validate=None):
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                out = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) if compress else raw
+                for chunk in iter(lambda: stream.read(1 << 16), b''):
+                    if len(head) < 256:
+                        head += chunk[:256 - len(head)]
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+                if compress:
+                    out.close()
+            error = validate(head) if validate else None
+            if error:
+                raise ValueError(error)
+            sha256 = digest.hexdigest()
+            with self.lock, self._connect() as db:
+                existing = db.execute("SELECT compressed FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                if existing is None or not os.path.exists(self.blob_path(sha256, existing[0])):
+                    path = self.blob_path(sha256, compress)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                    db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)", (sha256, size, os.path.getsize(path), int(compress)))
+                cursor = db.execute("INSERT INTO artifacts (sha256, device, action, name, created, size) VALUES (?, ?, ?, ?, ?, ?)",
+                                    (sha256, device, action, name, time.time(), size))
+                artifact_id = cursor.lastrowid
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=artifact_id)
+        return artifact_id
+
+    def put_text(self, text, device, action, name):
+        return self.put_stream(io.BytesIO(text.encode('utf-8')), device, action, name, compress=True)
+
+    def put_file(self, path, device, action, name=None, compress=False, move=True):
+        with open(path, 'rb') as f:
+            artifact_id = self.put_stream(f, device, action, name or os.path.basename(path), compress)
+        if move:
+            os.remove(path)
+        return artifact_id
+
+    def get(self, artifact_id):
+        with self._connect() as db:
+            row = db.execute("SELECT a.id, a.sha256, a.device, a.action, a.name, a.created, a.size, b.compressed FROM artifacts a "
+                             "JOIN blobs b ON a.sha256 = b.sha256 WHERE a.id = ?", (artifact_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No artifact with id {artifact_id}")
+        keys = ("id", "sha256", "device", "action", "name", "created", "size", "compressed")
+        record = dict(zip(keys, row))
+        record["path"] = self.blob_path(record["sha256"], record["compressed"])
+        return record
+
+    def contains(self, action, name):
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM artifacts WHERE action = ? AND name = ? LIMIT 1", (action, name)).fetchone() is not None
+
+    def actions(self):
+        with self._connect() as db:
+            return [row[0] for row in db.execute("SELECT DISTINCT action FROM artifacts ORDER BY action")]
+
+    def list(self, action=None, device=None, limit=200):
+        query = "SELECT id FROM artifacts WHERE 1 = 1"
+        params = []
+        if action:
+            query += " AND action = ?"
+            params.append(action)
+        if device:
+            query += " AND device = ?"
+            params.append(device)
+        query += " ORDER BY created DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as db:
+            ids = [row[0] for row in db.execute(query, params)]
+        return [self.get(artifact_id) for artifact_id in ids]
+
+    def open(self, artifact_id):
+        record = self.get(artifact_id)
+        return gzip.open(record["path"], 'rb') if record["compressed"] else open(record["path"], 'rb')
+
+    def export(self, artifact_id, dest):
+        with self.open(artifact_id) as src, open(dest, 'wb') as out:
+            shutil.copyfileobj(src, out)
+
+    def delete(self, artifact_id):
+        with self.lock, self._connect() as db:
+            db.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+            self._drop_orphans(db)
+
+    def _drop_orphans(self, db):
+        orphans = db.execute("SELECT sha256, compressed FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM artifacts)").fetchall()
+        for sha256, compressed in orphans:
+            try:
+                os.remove(self.blob_path(sha256, compressed))
+            except FileNotFoundError:
+                pass
+            db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+
+    def evict(self, keep=None):
+        # never evicts `keep` (the artifact just stored) or anything sharing its blob, which would free nothing
+        cutoff = time.time() - self.config["retention_days"] * 86400
+        evicted = []
+        with self.lock, self._connect() as db:
+            row = db.execute("SELECT sha256 FROM artifacts WHERE id = ?", (keep,)).fetchone()
+            keep_sha256 = row[0] if row else None
+            candidates = "FROM artifacts WHERE id IS NOT ? AND sha256 IS NOT ?"
+            expired = db.execute(f"SELECT id, name, action, device {candidates} AND created < ?", (keep, keep_sha256, cutoff)).fetchall()
+            evicted.extend(expired)
+            db.executemany("DELETE FROM artifacts WHERE id = ?", [(row[0],) for row in expired])
+            self._drop_orphans(db)
+            total = db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+            while total > self.config["max_bytes"]:
+                oldest = db.execute(f"SELECT id, name, action, device {candidates} ORDER BY created LIMIT 1", (keep, keep_sha256)).fetchone()
+                if oldest is None:
+                    break
+                evicted.append(oldest)
+                db.execute("DELETE FROM artifacts WHERE id = ?", (oldest[0],))
+                self._drop_orphans(db)
+                total = db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+        if self.on_evict:
+            for _, name, action, device in evicted:
+                self.on_evict(name, action, device)
+
+class SearchIndex:
+    BATCH_LINES = 5000
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, db_path, session):
+        self.db_path = db_path
+        self.session = session
+        self.pending = queue.Queue()
+        with sqlite3.connect(db_path) as db:
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5("
+                       "text, kind UNINDEXED, device UNINDEXED, action UNINDEXED, session UNINDEXED, created UNINDEXED)")
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def add(self, kind, device, action, text):
+        self.pending.put((kind, device or "", action or "", text, time.time()))
+
+    def _write_loop(self):
+        db = sqlite3.connect(self.db_path)
+        running = True
+        while running:
+            rows = []
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(rows) < self.BATCH_LINES:
+                try:
+                    item = self.pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                kind, device, action, text, created = item
+                rows.extend((line, kind, device, action, self.session, created) for line in text.splitlines() if line.strip())
+            if rows:
+                with db:
+                    db.executemany("INSERT INTO lines (text, kind, device, action, session, created) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        db.close()
+
+    def search(self, query, device=None, limit=200):
+        terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+        if not terms:
+            return []
+        sql = "SELECT created, session, device, action, kind, text FROM lines WHERE lines MATCH ?"
+        params = [" ".join(terms)]
+        if device:
+            sql += " AND device = ?"
+            params.append(device)
+        sql += " ORDER BY rowid DESC LIMIT ?"  # newest first; ranking every match with bm25 is too slow on large indexes
+        params.append(limit)
+        with sqlite3.connect(self.db_path) as db:
+            return db.execute(sql, params).fetchall()
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join(timeout=5)
+
+class SnapshotStore:
+    BUCKETS = 16
+    PROPERTY_PREFIXES = ("ro.", "persist.", "gsm.version.")
+    PARTITION_PROP_RE = re.compile(r"^ro\.(?:\w+\.)?build\.(?:fingerprint|id|version\.incremental|date\.utc)$|^ro\.bootloader$|^gsm\.version\.baseband$")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets (hash TEXT PRIMARY KEY, data BLOB)")
+            db.execute("CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, device TEXT, taken REAL, root TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS sections (snapshot_id INTEGER, name TEXT, hash TEXT, buckets TEXT, PRIMARY KEY (snapshot_id, name))")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def normalize(self, packages_text, getprop_text, package_dump_text):
+        packages = {}
+        for line in iter_lines(packages_text):
+            if line.startswith("package:") and "=" in line:
+                path, name = line[len("package:"):].rsplit("=", 1)
+                packages[name] = path
+        properties = {}
+        for line in iter_lines(getprop_text):
+            match = re.match(r"^\[([^\]]+)\]: \[(.*)\]$", line)
+            if match and match.group(1).startswith(self.PROPERTY_PREFIXES):
+                properties[match.group(1)] = match.group(2)
+        permissions = {}
+        for package in parse_dumpsys("package", package_dump_text):
+            for permission, granted in package.granted_permissions.items():
+                permissions[f"{package.name} {permission}"] = "granted" if granted else "denied"
+        partitions = {key: value for key, value in properties.items() if self.PARTITION_PROP_RE.match(key)}
+        return {"packages": packages, "permissions": permissions, "properties": properties, "partitions": partitions}
+
+    def _buckets(self, entries):
+        buckets = [[] for _ in range(self.BUCKETS)]
+        for key in sorted(entries):
+            buckets[int(hashlib.md5(key.encode('utf-8')).hexdigest()[:4], 16) % self.BUCKETS].append([key, entries[key]])
+        return [zlib.compress(json.dumps(bucket, separators=(",", ":")).encode('utf-8')) for bucket in buckets]
+
+    def save(self, device, sections):
+        section_rows = []
+        with self.lock, self._connect() as db:
+            for name in sorted(sections):
+                bucket_hashes = []
+                for data in self._buckets(sections[name]):
+                    bucket_hash = self._hash(data)
+                    db.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?)", (bucket_hash, data))
+                    bucket_hashes.append(bucket_hash)
+                section_rows.append((name, self._hash("".join(bucket_hashes).encode()), json.dumps(bucket_hashes)))
+            root = self._hash("".join(row[1] for row in section_rows).encode())
+            snapshot_id = db.execute("INSERT INTO snapshots (device, taken, root) VALUES (?, ?, ?)", (device, time.time(), root)).lastrowid
+            db.executemany("INSERT INTO sections VALUES (?, ?, ?, ?)", [(snapshot_id,) + row for row in section_rows])
+        return snapshot_id
+
+    def latest(self, device, before=None):
+        query = "SELECT id FROM snapshots WHERE device = ?"
+        params = [device]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        with self._connect() as db:
+            row = db.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def _sections(self, snapshot_id):
+        with self._connect() as db:
+            return {name: (section_hash, json.loads(buckets)) for name, section_hash, buckets in
+                    db.execute("SELECT name, hash, buckets FROM sections WHERE snapshot_id = ?", (snapshot_id,))}
+
+    def _bucket(self, bucket_hash):
+        with self._connect() as db:
+            data = db.execute("SELECT data FROM buckets WHERE hash = ?", (bucket_hash,)).fetchone()[0]
+        return dict(json.loads(zlib.decompress(data)))
+
+    def diff_buckets(self, buckets_a, buckets_b):
+        changes = {"added": [], "removed": [], "changed": []}
+        for hash_a, hash_b in zip(buckets_a, buckets_b):
+            if hash_a == hash_b:
+                continue
+            entries_a, entries_b = self._bucket(hash_a), self._bucket(hash_b)
+            changes["removed"].extend(key for key in entries_a if key not in entries_b)
+            changes["added"].extend(key for key in entries_b if key not in entries_a)
+            changes["changed"].extend(f"{key}: {entries_a[key]} -> {entries_b[key]}" for key in entries_a
+                                      if key in entries_b and entries_a[key] != entries_b[key])
+        for values in changes.values():
+            values.sort()
+        return changes
+
+    def diff(self, snapshot_a, snapshot_b):
+        sections_a, sections_b = self._sections(snapshot_a), self._sections(snapshot_b)
+        return {name: self.diff_buckets(sections_a[name][1], sections_b[name][1])
+                for name in sorted(sections_a) if name in sections_b and sections_a[name][0] != sections_b[name][0]}
+
+    def fleet_report(self, snapshot_ids, limit=20):
+        lines = [f"Fleet report over {len(snapshot_ids)} device(s):"]
+        with self._connect() as db:
+            devices = dict(db.execute(f"SELECT id, device FROM snapshots WHERE id IN ({','.join('?' * len(snapshot_ids))})", snapshot_ids).fetchall())
+        sections = {snapshot_id: self._sections(snapshot_id) for snapshot_id in snapshot_ids}
+        names = sorted({name for per_snapshot in sections.values() for name in per_snapshot})
+        for name in names:
+            groups = {}
+            for snapshot_id, per_snapshot in sections.items():
+                if name in per_snapshot:
+                    section_hash, buckets = per_snapshot[name]
+                    groups.setdefault(section_hash, (buckets, []))[1].append(devices[snapshot_id])
+            baseline_hash = max(groups, key=lambda section_hash: len(groups[section_hash][1]))
+            baseline_buckets, baseline_devices = groups[baseline_hash]
+            if len(groups) == 1:
+                lines.append(f"[{name}] identical on all {len(baseline_devices)} device(s)")
+                continue
+            lines.append(f"[{name}] {len(groups)} variant(s); baseline shared by {len(baseline_devices)} device(s)")
+            for section_hash, (buckets, group_devices) in groups.items():
+                if section_hash == baseline_hash:
+                    continue
+                changes = self.diff_buckets(baseline_buckets, buckets)
+                lines.append(f"  {', '.join(sorted(group_devices))}:")
+                for kind in ("added", "removed", "changed"):
+                    for item in changes[kind][:limit]:
+                        lines.append(f"    {kind}: {item}")
+                    if len(changes[kind]) > limit:
+                        lines.append(f"    ... {len(changes[kind]) - limit} more {kind}")
+        return "\n".join(lines)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def validate_png(head):
+    # exec-out has no shell protocol: device errors arrive on stdout and the exit status is lost
+    if head.startswith(PNG_SIGNATURE):
+        return None
+    return f"device did not return a PNG: {head.decode('utf-8', errors='replace').strip()[:200] or 'empty output'}"
+
+H264_START_CODES = (b"\x00\x00\x00\x01", b"\x00\x00\x01")
+
+def validate_h264(head):
+    # screenrecord's usage and error text also arrives on stdout under exec-out
+    if head.startswith(H264_START_CODES):
+        return None
+    return f"screenrecord did not return H.264: {head.decode('utf-8', errors='replace').strip()[:200] or 'empty output'}"
+
+class CaptureThread(QThread):
+    result = pyqtSignal(str, str, bool)  # message, status, success
+
+    def __init__(self, store, command, device, action, name, success_msg, error_msg, export_path=None, validate=None):
+        super().__init__()
+        self.store = store
+        self.command = command
+        self.device = device
+        self.action = action
+        self.name = name
+        self.success_msg = success_msg
+        self.error_msg = error_msg
+        self.export_path = export_path
+        self.validate = validate
+
+    def run(self):
+        try:
+            process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                artifact_id = self.store.put_stream(process.stdout, self.device, self.action, self.name, validate=self.validate)
+            except ValueError as e:
+                process.wait()
+                self.result.emit(f"{self.error_msg}: {str(e)}", self.error_msg, False)
+                return
+            stderr = process.stderr.read().decode('utf-8', errors='replace')
+            process.wait()
+            if process.returncode != 0 or self.store.get(artifact_id)["size"] == 0:
+                self.store.delete(artifact_id)
+                self.result.emit(f"{self.error_msg}: {stderr}", self.error_msg, False)
+                return
+            if self.export_path:
+                self.store.export(artifact_id, self.export_path)
+            self.result.emit(f"{self.success_msg}: {self.name}", self.success_msg, True)
+        except Exception as e:
+            self.result.emit(f"Error: {str(e)}", "Error", False)
+
+class PullThread(QThread):
+    result = pyqtSignal(str, str, bool)  # message, status, success
+
+    def __init__(self, store, adb_path, device, remote_path):
+        super().__init__()
+        self.store = store
+        self.adb_path = adb_path
+        self.device = device
+        self.remote_path = remote_path
+
+    def run(self):
+        pull_dir = tempfile.mkdtemp(dir=self.store.tmp_dir)
+        try:
+            subprocess.run([self.adb_path, "-s", self.device, "pull", self.remote_path, pull_dir],
+                           check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+            name = os.path.basename(self.remote_path.rstrip("/")) or "root"
+            local_path = os.path.join(pull_dir, name)
+            if os.path.isdir(local_path):
+                archive = shutil.make_archive(os.path.join(pull_dir, name), 'zip', pull_dir, name)
+                self.store.put_file(archive, self.device, "pull", f"{name}.zip")
+                name += ".zip"
+            else:
+                self.store.put_file(local_path, self.device, "pull", name)
+            self.result.emit(f"File pulled: {name} (see Artifacts)", "File pulled", True)
+        except subprocess.CalledProcessError as e:
+            self.result.emit(f"Failed to pull file: {e.stderr or e.stdout}", "Failed to pull file", False)
+        except Exception as e:
+            self.result.emit(f"Error: {str(e)}", "Error", False)
+        finally:
+            shutil.rmtree(pull_dir, ignore_errors=True)
+
 class WorkerThread(QThread):
     result = pyqtSignal(str, str, bool)  # message, status, success
     output = pyqtSignal(str)
 
-    def __init__(self, adb_path, command, success_msg, error_msg, output_to_text=False):
+    def __init__(self, adb_path, command, success_msg, error_msg, output_to_text=False, store=None, parser=None):
         super().__init__()
         self.adb_path = adb_path
         self.command = command
         self.success_msg = success_msg
         self.error_msg = error_msg
         self.output_to_text = output_to_text
+        self.store = store
+        self.parser = parser  # key into DUMPSYS_PARSERS
 
     def run(self):
         try:
@@ -35,77 +972,161 @@ class WorkerThread(QThread):
                     result = ""
                     for cmd in self.command:
                         cmd[0] = self.adb_path
-                        result += subprocess.run(cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace').stdout
+                        result += adb_run(cmd, check=True).stdout
                 else:
                     self.command[0] = self.adb_path
-                    result = subprocess.run(self.command, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace').stdout
+                    result = adb_run(self.command, check=True).stdout
             else:
                 raise ValueError("ADB path not set and command requires ADB")
             self.result.emit(f"{self.success_msg}: {result}", self.success_msg, True)
             if self.output_to_text:
-                self.output.emit(result)
+                if self.parser:
+                    try:
+                        self.output.emit(f"{format_record(parse_dumpsys(self.parser, result))}\n\n--- raw output ---\n{result}")
+                    except Exception as e:
+                        self.output.emit(f"Could not parse dumpsys {self.parser}: {str(e)}\n\n--- raw output ---\n{result}")
+                else:
+                    self.output.emit(result)
+                if self.store is not None and result:
+                    self._store_output(result)
         except subprocess.CalledProcessError as e:
             self.result.emit(f"{self.error_msg}: {e.stderr}", self.error_msg, False)
         except Exception as e:
             self.result.emit(f"Error: {str(e)}", "Error", False)
 
+    def _store_output(self, text):
+        try:
+            self.store.put_text(text, command_device(self.command), self.success_msg, f"output_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        except (OSError, sqlite3.Error):
+            pass
+
 class MirrorThread(QThread):
     log_signal = pyqtSignal(str)
     status_signal = pyqtSignal(str, str)
     output_signal = pyqtSignal(str)
     finished = pyqtSignal()
 
+    READY_MARKERS = ("Renderer:", "Texture:", "INFO: Device:")
+    READY_TIMEOUT = 15
+    _version_cache = {}    # scrcpy path -> version string
+    _preflight_cache = {}  # (device, scrcpy version) -> diagnostic report lines
+    _cache_lock = threading.Lock()
+
     def __init__(self, adb_path, connected_ip):
         super().__init__()
         self.adb_path = adb_path
         self.connected_ip = connected_ip
         self.scrcpy_process = None
 
+    def _scrcpy_version(self, scrcpy_path):
+        with self._cache_lock:
+            if scrcpy_path in self._version_cache:
+                return self._version_cache[scrcpy_path]
+        version_check = subprocess.run([scrcpy_path, "--version"], capture_output=True, text=True, encoding='utf-8', errors='replace')
+        if version_check.returncode != 0:
+            raise FileNotFoundError(f"scrcpy not found: {version_check.stderr}")
+        version = version_check.stdout.strip().splitlines()[0] if version_check.stdout.strip() else "unknown"
+        with self._cache_lock:
+            self._version_cache[scrcpy_path] = version
+        return version
+
+    def _screencap_test(self, device):
+        screencap_test = subprocess.run([self.adb_path, "-s", device, "shell", "screencap", "/sdcard/test.png"], capture_output=True, text=True, encoding='utf-8', errors='replace')
+        if screencap_test.returncode != 0:
+            return [f"Screen capture failed: {screencap_test.stderr}",
+                    "Issue: Device may not support screen capture without root or additional setup."]
+        return ["Screen capture test: Success"]
+
+    def _logcat_scan(self, device):
+        report = []
+        logcat = subprocess.run([self.adb_path, "-s", device, "logcat", "-d", "-t", "5000"], capture_output=True, text=True, encoding='utf-8', errors='replace')
+        scrcpy_log = "\n".join(line for line in logcat.stdout.splitlines() if "scrcpy" in line.lower())
+        if scrcpy_log:
+            report.append(f"Logcat (pre-run, scrcpy-related):\n{scrcpy_log}")
+            if "avc: denied" in scrcpy_log.lower():
+                report.append("Warning: SELinux denials detected.")
+            if "killed" in scrcpy_log.lower():
+                report.append("Warning: Previous scrcpy server was killed.")
+        return report
+
+    def _wait_until_ready(self):
+        ready = threading.Event()
+        detected = threading.Event()
+        lines = []
+
+        def reader():
+            for line in self.scrcpy_process.stdout:
+                if len(lines) < 200:
+                    lines.append(line.rstrip())
+                if not ready.is_set() and any(marker in line for marker in self.READY_MARKERS):
+                    detected.set()
+                    ready.set()
+            ready.set()  # EOF: scrcpy exited
+
+        threading.Thread(target=reader, daemon=True).start()
+        ready.wait(self.READY_TIMEOUT)
+        if not detected.is_set():
+            try:
+                self.scrcpy_process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        return self.scrcpy_process.poll() is None, detected.is_set(), lines
+
     def run(self):
         self.log_signal.emit("Starting screen mirroring thread...")
         report = ["Screen Mirroring Diagnostic Report:"]
+        device = f"{self.connected_ip}:5555"
         try:
             scrcpy_path = "scrcpy"
             if hasattr(sys, '_MEIPASS'):
                 scrcpy_path = os.path.join(sys._MEIPASS, "scrcpy.exe")
-            version_check = subprocess.run([scrcpy_path, "--version"], capture_output=True, text=True, encoding='utf-8', errors='replace')
-            if version_check.returncode != 0:
-                raise FileNotFoundError(f"scrcpy not found: {version_check.stderr}")
-            report.append(f"scrcpy version: {version_check.stdout.strip()}")
-
-            devices = subprocess.run([self.adb_path, "devices", "-l"], capture_output=True, text=True, encoding='utf-8', errors='replace')
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                version_future = pool.submit(self._scrcpy_version, scrcpy_path)
+                devices_future = pool.submit(adb_run, [self.adb_path, "devices", "-l"])
+                version = version_future.result()
+                devices = devices_future.result()
+            report.append(f"scrcpy version: {version}")
             report.append(f"ADB devices: {devices.stdout}")
-            if f"{self.connected_ip}:5555" not in devices.stdout or "unauthorized" in devices.stdout.lower():
+            if device not in devices.stdout or "unauthorized" in devices.stdout.lower():
                 raise ValueError("Device not connected or unauthorized. Check USB debugging and authorization prompt.")
 
-            screencap_test = subprocess.run([self.adb_path, "-s", f"{self.connected_ip}:5555", "shell", "screencap", "/sdcard/test.png"], capture_output=True, text=True, encoding='utf-8', errors='replace')
-            if screencap_test.returncode != 0:
-                report.append(f"Screen capture failed: {screencap_test.stderr}")
-                report.append("Issue: Device may not support screen capture without root or additional setup.")
+            cache_key = (device, version)
+            with self._cache_lock:
+                diagnostics = self._preflight_cache.get(cache_key)
+            if diagnostics is None:
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    screencap_future = pool.submit(self._screencap_test, device)
+                    logcat_future = pool.submit(self._logcat_scan, device)
+                    diagnostics = screencap_future.result() + logcat_future.result()
+                with self._cache_lock:
+                    self._preflight_cache[cache_key] = diagnostics
             else:
-                report.append("Screen capture test: Success")
-
-            logcat = subprocess.run([self.adb_path, "-s", f"{self.connected_ip}:5555", "logcat", "-d"], capture_output=True, text=True, encoding='utf-8', errors='replace')
-            scrcpy_log = "\n".join(line for line in logcat.stdout.splitlines() if "scrcpy" in line.lower())
-            if scrcpy_log:
-                report.append(f"Logcat (pre-run, scrcpy-related):\n{scrcpy_log}")
-                if "avc: denied" in scrcpy_log.lower():
-                    report.append("Warning: SELinux denials detected.")
-                if "killed" in scrcpy_log.lower():
-                    report.append("Warning: Previous scrcpy server was killed.")
-
-            cmd = [scrcpy_path, "-s", f"{self.connected_ip}:5555", "--verbosity=debug"]
+                report.append("Preflight diagnostics: cached")
+            report.extend(diagnostics)
+
+            cmd = [scrcpy_path, "-s", device, "--verbosity=debug"]
             self.log_signal.emit(f"Launching scrcpy with command: {' '.join(cmd)}")
-            self.scrcpy_process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
-            time.sleep(2)
-            if self.scrcpy_process.poll() is None:
+            self.scrcpy_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+            running, detected, scrcpy_output = self._wait_until_ready()
+            if running and detected:
                 self.log_signal.emit("Screen mirroring started successfully")
                 self.status_signal.emit("Mirroring started", "green")
                 report.append("Result: Success (scrcpy running in background)")
+            elif running:
+                self.log_signal.emit(f"scrcpy is running but did not report readiness within {self.READY_TIMEOUT}s")
+                self.status_signal.emit("Mirroring state undetermined", "yellow")
+                report.append(f"Warning: no readiness line from scrcpy within {self.READY_TIMEOUT}s")
+                if scrcpy_output:
+                    report.append("scrcpy output:\n" + "\n".join(scrcpy_output[-20:]))
+                report.append("Result: Undetermined (scrcpy still running, readiness not confirmed)")
             else:
+                with self._cache_lock:
+                    self._preflight_cache.pop(cache_key, None)
                 self.log_signal.emit("Screen mirroring failed to start")
                 self.status_signal.emit("Error: Mirroring failed!", "red")
                 report.append(f"scrcpy failed to start (exit code: {self.scrcpy_process.returncode})")
+                if scrcpy_output:
+                    report.append("scrcpy output:\n" + "\n".join(scrcpy_output[-20:]))
                 report.append("Result: Failed - scrcpy did not launch properly")
         except FileNotFoundError as e:
             self.log_signal.emit(f"scrcpy not installed: {str(e)}")
@@ -123,6 +1144,854 @@ class MirrorThread(QThread):
         self.output_signal.emit("\n".join(report))
         self.finished.emit()
 
+class ScreenRecordThread(QThread):
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str, str)
+    segment_saved = pyqtSignal(str)
+
+    SEGMENT_LIMIT = 180  # screenrecord refuses anything longer per invocation
+
+    def __init__(self, adb_path, device, base_path, duration=0, store=None):
+        super().__init__()
+        self.adb_path = adb_path
+        self.device = device
+        self.base_path = os.path.splitext(base_path)[0]
+        self.duration = duration  # 0 records until stopped
+        self.store = store
+        self.process = None
+        self.stopping = False
+        self.remux_queue = queue.Queue()
+
+    def stop(self):
+        self.stopping = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def run(self):
+        remuxer = threading.Thread(target=self._remux_worker, daemon=True)
+        remuxer.start()
+        started = time.monotonic()
+        segment = 0
+        try:
+            while not self.stopping:
+                remaining = self.SEGMENT_LIMIT
+                if self.duration:
+                    remaining = min(remaining, int(self.duration - (time.monotonic() - started)))
+                    if remaining <= 0:
+                        break
+                segment += 1
+                segment_path = f"{self.base_path}_part{segment:03d}.h264"
+                cmd = [self.adb_path, "-s", self.device, "exec-out", "screenrecord",
+                       "--output-format=h264", f"--time-limit={remaining}", "-"]
+                self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                if self.stopping:  # stop() may have raced the spawn and hit the previous process
+                    self.process.terminate()
+                segment_started = time.monotonic()
+                written, head = 0, b""
+                with open(segment_path, 'wb') as f:
+                    for chunk in iter(lambda: self.process.stdout.read(65536), b''):
+                        if len(head) < 256:
+                            head += chunk[:256 - len(head)]
+                        f.write(chunk)
+                        written += len(chunk)
+                self.process.wait()
+                if written == 0:
+                    os.remove(segment_path)
+                    if self.stopping:
+                        break
+                    raise RuntimeError(f"screenrecord produced no data (exit code {self.process.returncode}); device may be disconnected")
+                error = validate_h264(head)
+                if error:
+                    os.remove(segment_path)
+                    raise RuntimeError(f"{error} (exit code {self.process.returncode})")
+                self.log_signal.emit(f"Recording segment {segment} captured ({written // 1024} KB)")
+                self.remux_queue.put(segment_path)
+                elapsed = time.monotonic() - segment_started
+                if self.process.returncode != 0 and not self.stopping and elapsed < remaining * 0.9:
+                    raise RuntimeError(f"screenrecord exited with code {self.process.returncode} after {elapsed:.0f}s of {remaining}s; device may be disconnected")
+            self.status_signal.emit(f"Video recorded ({segment} segment(s))", "green")
+        except Exception as e:
+            self.log_signal.emit(f"Video recording failed: {str(e)}")
+            self.status_signal.emit("Video recording failed", "red")
+        finally:
+            self.remux_queue.put(None)
+            remuxer.join()
+
+    def _remux_worker(self):
+        while True:
+            segment_path = self.remux_queue.get()
+            if segment_path is None:
+                return
+            mp4_path = os.path.splitext(segment_path)[0] + ".mp4"
+            try:
+                subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "h264", "-i", segment_path, "-c", "copy", mp4_path],
+                               check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+                os.remove(segment_path)
+                saved_path = mp4_path
+            except FileNotFoundError:
+                self.log_signal.emit(f"ffmpeg not found, keeping raw H.264 segment: {segment_path}")
+                saved_path = segment_path
+            except subprocess.CalledProcessError as e:
+                self.log_signal.emit(f"Remux failed for {segment_path}: {e.stderr}")
+                saved_path = segment_path
+            if self.store is not None:
+                try:
+                    self.store.put_file(saved_path, self.device, "recording")
+                    saved_path = os.path.basename(saved_path)
+                except (OSError, sqlite3.Error) as e:
+                    self.log_signal.emit(f"Could not store {saved_path}: {e}")
+            self.segment_saved.emit(saved_path)
+
+_getvar_cache = {}  # fastboot serial -> parsed `getvar all` record
+_getvar_lock = threading.Lock()
+
+# variables of the form name:qualifier:value, e.g. partition-size:boot_a:0x4000000
+GETVAR_QUALIFIED = ("partition-size", "partition-type", "is-logical", "has-slot",
+                    "slot-successful", "slot-unbootable", "slot-retry-count")
+
+def parse_getvar(text):
+    record = {"variables": {}, "partitions": {}}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("(bootloader)"):
+            line = line[len("(bootloader)"):].strip()
+        if ":" not in line or line.startswith(("all:", "getvar:", "Finished.", "finished.", "OKAY", "FAILED")):
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        if key in GETVAR_QUALIFIED and ":" in value:
+            qualifier, value = (part.strip() for part in value.split(":", 1))
+            if key in ("partition-size", "partition-type"):
+                entry = record["partitions"].setdefault(qualifier, {})
+                if key == "partition-size":
+                    try:
+                        entry["size"] = int(value, 16)
+                    except ValueError:
+                        entry["size"] = value
+                else:
+                    entry["type"] = value
+                continue
+            key = f"{key}:{qualifier}"
+        record["variables"][key] = value
+    record["current_slot"] = record["variables"].get("current-slot", "")
+    return record
+
+def invalidate_getvar(serial=None):
+    with _getvar_lock:
+        if serial is None:
+            _getvar_cache.clear()
+        else:
+            _getvar_cache.pop(serial, None)
+
+def fastboot_getvar(serial, refresh=False):
+    with _getvar_lock:
+        if not refresh and serial in _getvar_cache:
+            return _getvar_cache[serial]
+    # fastboot writes variables to stderr
+    result = subprocess.run(["fastboot", "-s", serial, "getvar", "all"], capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=30)
+    record = parse_getvar(result.stderr + result.stdout)
+    record["serial"] = serial
+    with _getvar_lock:
+        _getvar_cache[serial] = record
+    return record
+
+def fastboot_serials():
+    result = subprocess.run(["fastboot", "devices"], capture_output=True, text=True, encoding='utf-8', errors='replace')
+    return [line.split()[0] for line in result.stdout.splitlines() if line.strip() and "fastboot" in line]
+
+class FlashThread(QThread):
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str, str)
+    progress_signal = pyqtSignal(str, str, int)  # serial, partition, percent (-1 skipped, -2 failed)
+    output_signal = pyqtSignal(str)
+
+    STEP_RE = re.compile(r"^(Sending|Writing)(?: sparse)? '([^']+)'(?: (\d+)/(\d+))?")
+
+    def __init__(self, manifest_path, cache_path, serials=None):
+        super().__init__()
+        self.manifest_path = manifest_path
+        self.cache_path = cache_path
+        self.serials = serials
+        self.cache_lock = threading.Lock()
+        self.skip_unchanged = False  # opt-in: trust this app's own record of the last flash
+
+    def _load_manifest(self):
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(self.manifest_path))
+        entries = []
+        for partition, spec in manifest.get("partitions", {}).items():
+            if isinstance(spec, str):
+                spec = {"image": spec}
+            image = spec["image"]
+            if not os.path.isabs(image):
+                image = os.path.join(base_dir, image)
+            if not os.path.isfile(image):
+                raise FileNotFoundError(f"Image for {partition} not found: {image}")
+            entries.append({"partition": partition, "image": image, "expect": spec.get("expect", {}),
+                            "slot": spec.get("slot", manifest.get("slot"))})
+        if not entries:
+            raise ValueError("Manifest lists no partitions")
+        self.skip_unchanged = bool(manifest.get("skip_unchanged", False))
+        return entries
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"images": {}, "flashed": {}}
+
+    def _save_cache(self, cache):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def _image_hash(self, cache, image):
+        stat = os.stat(image)
+        cached = cache["images"].get(image)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            return cached["sha256"]
+        digest = hashlib.sha256()
+        with open(image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        cache["images"][image] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    @staticmethod
+    def _slot_key(entry, variables):
+        return f"{entry['partition']}@{entry['slot'] or variables.get('current-slot', '')}"
+
+    def _skip_reason(self, cache, serial, entry, variables):
+        expect = entry["expect"]
+        if expect and all(variables.get(key) == value for key, value in expect.items()):
+            return "getvar matches"
+        # the record only knows what this app flashed, not what other tools or the Flash button wrote since
+        if self.skip_unchanged and cache["flashed"].get(serial, {}).get(self._slot_key(entry, variables)) == entry["sha256"]:
+            return "image hash matches last manifest flash"
+        return None
+
+    def _flash_one(self, serial, entry):
+        partition = entry["partition"]
+        cmd = ["fastboot", "-s", serial, "flash"]
+        if entry["slot"]:
+            cmd.append(f"--slot={entry['slot']}")
+        cmd += [partition, entry["image"]]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+        output, total = [], 1
+        for line in process.stdout:
+            output.append(line.rstrip())
+            match = self.STEP_RE.match(line.strip())
+            if match and "OKAY" in line:
+                step, index, count = match.group(1), match.group(3), match.group(4)
+                if count:
+                    total = int(count)
+                index = int(index) if index else total
+                done = 2 * index - (1 if step == "Sending" else 0)
+                self.progress_signal.emit(serial, partition, min(99, int(100 * done / (2 * total))))
+        process.wait()
+        if process.returncode != 0:
+            raise RuntimeError("\n".join(output[-5:]))
+
+    def _flash_device(self, serial, entries, cache):
+        results = []
+        variables = fastboot_getvar(serial)["variables"]
+        for entry in entries:
+            partition = entry["partition"]
+            with self.cache_lock:
+                reason = self._skip_reason(cache, serial, entry, variables)
+            if reason:
+                self.progress_signal.emit(serial, partition, -1)
+                results.append(f"{serial} {partition}: skipped ({reason})")
+                continue
+            self.progress_signal.emit(serial, partition, 0)
+            with self.cache_lock:
+                cache["flashed"].get(serial, {}).pop(self._slot_key(entry, variables), None)
+            try:
+                self._flash_one(serial, entry)
+            except Exception as e:
+                self.progress_signal.emit(serial, partition, -2)
+                results.append(f"{serial} {partition}: FAILED - {str(e)}")
+                break
+            self.progress_signal.emit(serial, partition, 100)
+            with self.cache_lock:
+                cache["flashed"].setdefault(serial, {})[self._slot_key(entry, variables)] = entry["sha256"]
+                self._save_cache(cache)
+            results.append(f"{serial} {partition}: flashed")
+        if any(line.endswith(": flashed") for line in results):
+            invalidate_getvar(serial)
+        return results
+
+    def run(self):
+        report = [f"Flash Report ({os.path.basename(self.manifest_path)}):"]
+        try:
+            entries = self._load_manifest()
+            cache = self._load_cache()
+            for entry in entries:
+                entry["sha256"] = self._image_hash(cache, entry["image"])
+            self._save_cache(cache)
+            serials = self.serials or fastboot_serials()
+            if not serials:
+                raise ValueError("No devices in fastboot mode")
+            self.log_signal.emit(f"Flashing {len(entries)} partition(s) on {len(serials)} device(s)")
+            with ThreadPoolExecutor(max_workers=len(serials)) as pool:
+                for results in pool.map(lambda serial: self._flash_device(serial, entries, cache), serials):
+                    report.extend(results)
+            failed = any("FAILED" in line for line in report)
+            self.status_signal.emit("Flashing finished with errors" if failed else "Flashing complete", "red" if failed else "green")
+        except Exception as e:
+            self.log_signal.emit(f"Flashing failed: {str(e)}")
+            self.status_signal.emit("Error: Flashing failed!", "red")
+            report.append(f"Error: {str(e)}")
+        self.log_signal.emit("\n".join(report))
+        self.output_signal.emit("\n".join(report))
+
+class FlashProgressDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Flashing")
+        self.setMinimumWidth(400)
+        self.rows = QVBoxLayout()
+        self.setLayout(self.rows)
+        self.bars = {}
+
+    def update_progress(self, serial, partition, percent):
+        key = (serial, partition)
+        if key not in self.bars:
+            row = QHBoxLayout()
+            label = QLabel(f"{serial} / {partition}")
+            label.setMinimumWidth(200)
+            row.addWidget(label)
+            bar = QProgressBar()
+            bar.setRange(0, 100)
+            row.addWidget(bar)
+            self.rows.addLayout(row)
+            self.bars[key] = bar
+        bar = self.bars[key]
+        if percent == -1:
+            bar.setValue(100)
+            bar.setFormat("skipped")
+        elif percent == -2:
+            bar.setFormat("failed")
+        else:
+            bar.setValue(percent)
+
+class InputChannel:
+    DEVICE_PORT = 1080
+    CONNECT_TIMEOUT = 5
+    SWIPE_STEP_MS = 10
+
+    def __init__(self, adb_path, device, on_result=None):
+        self.adb_path = adb_path
+        self.device = device
+        self.on_result = on_result  # called with ((success_msg, error_msg), error); error is None on success
+        self.process = None
+        self.sock = None
+        self.reader = None
+        self.host_port = None
+        self.recorder = None
+        self.events = queue.Queue()
+        self.sender = threading.Thread(target=self._send_loop, daemon=True)
+        self.sender.start()
+
+    def _adb(self, *args):
+        return subprocess.run([self.adb_path, "-s", self.device] + list(args), capture_output=True, text=True,
+                              encoding='utf-8', errors='replace', timeout=10)
+
+    def _command(self, line):
+        self.sock.sendall((line + "\n").encode('utf-8'))
+        reply = self.reader.readline().decode('utf-8', errors='replace').strip()
+        if not reply:
+            raise ConnectionError("monkey session closed")
+        if not reply.startswith("OK"):
+            raise RuntimeError(f"device rejected '{line}': {reply}")
+        return reply
+
+    def _ensure_session(self):
+        # one long-lived monkey process on the device injects every event, so no
+        # per-event app_process start-up is paid the way `input` does
+        if self.sock is not None and self.process is not None and self.process.poll() is None:
+            return
+        self._close_session()
+        forward = self._adb("forward", "tcp:0", f"tcp:{self.DEVICE_PORT}")
+        if forward.returncode != 0 or not forward.stdout.strip().isdigit():
+            raise ConnectionError(f"adb forward failed: {forward.stderr.strip() or forward.stdout.strip()}")
+        self.host_port = int(forward.stdout.strip())
+        self.process = subprocess.Popen([self.adb_path, "-s", self.device, "shell", "monkey", "--port", str(self.DEVICE_PORT)],
+                                        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        while True:
+            try:
+                self.sock = socket.create_connection(("127.0.0.1", self.host_port), timeout=2)
+                self.reader = self.sock.makefile('rb')
+                self._command("wake")
+                self.sock.settimeout(10)
+                return
+            except (OSError, ConnectionError):
+                self._drop_socket()
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self._close_session()
+                    raise ConnectionError("could not start the monkey input session (device gone or unauthorized?)")
+                time.sleep(0.2)
+
+    def send(self, kind, *args, label=None):
+        if kind not in ("keyevent", "tap", "swipe"):
+            raise ValueError(f"Unsupported input event: {kind}")
+        expected = {"keyevent": (1,), "tap": (2,), "swipe": (4, 5)}[kind]
+        args = [int(arg) for arg in args]
+        if len(args) not in expected:
+            raise ValueError(f"{kind} takes {' or '.join(map(str, expected))} numeric argument(s)")
+        if self.recorder is not None:
+            self.recorder.record(kind, args)
+        self.events.put((kind, args, label))
+
+    def key(self, code, label=None):
+        self.send("keyevent", code, label=label)
+
+    def tap(self, x, y, label=None):
+        self.send("tap", x, y, label=label)
+
+    def swipe(self, x1, y1, x2, y2, duration_ms=300, label=None):
+        self.send("swipe", x1, y1, x2, y2, duration_ms, label=label)
+
+    def _inject(self, kind, args):
+        if kind == "keyevent":
+            self._command(f"key down {args[0]}")
+            self._command(f"key up {args[0]}")
+        elif kind == "tap":
+            self._command(f"tap {args[0]} {args[1]}")
+        else:
+            x1, y1, x2, y2 = args[:4]
+            duration_ms = args[4] if len(args) > 4 else 300
+            steps = max(1, duration_ms // self.SWIPE_STEP_MS)
+            self._command(f"touch down {x1} {y1}")
+            for step in range(1, steps + 1):
+                self._command(f"touch move {x1 + (x2 - x1) * step // steps} {y1 + (y2 - y1) * step // steps}")
+                self._command(f"sleep {self.SWIPE_STEP_MS}")
+            self._command(f"touch up {x2} {y2}")
+
+    def _send_loop(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            kind, args, label = event
+            try:
+                self._ensure_session()
+                self._inject(kind, args)
+                error = None
+            except (OSError, ConnectionError, RuntimeError, subprocess.SubprocessError) as e:
+                self._close_session()
+                error = str(e)
+            if self.on_result is not None and (label or error):
+                description = f"{kind} {' '.join(map(str, args))}"
+                self.on_result(label or (description, f"Failed to send {description}"), error)
+
+    def _drop_socket(self):
+        for handle in (self.reader, self.sock):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self.reader = self.sock = None
+
+    def _close_session(self):
+        if self.sock is not None:
+            try:
+                self.sock.sendall(b"quit\n")
+            except OSError:
+                pass
+        self._drop_socket()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+        self.process = None
+        if self.host_port is not None:
+            try:
+                self._adb("forward", "--remove", f"tcp:{self.host_port}")
+            except (OSError, subprocess.SubprocessError):
+                pass
+            self.host_port = None
+
+    def close(self):
+        self.events.put(None)
+        self.sender.join(timeout=2)
+        self._close_session()
+
+class InputMacro:
+    def __init__(self, events=None):
+        self.events = events or []  # [delay_seconds, kind, args]
+        self.last_time = None
+
+    def record(self, kind, args):
+        now = time.monotonic()
+        delay = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+        self.events.append([round(delay, 3), kind, list(args)])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"events": self.events}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)["events"])
+
+    def replay(self, channel):
+        for delay, kind, args in self.events:
+            if delay:
+                time.sleep(delay)
+            channel.send(kind, *args)
+
+    def replay_many(self, channels):
+        threads = [threading.Thread(target=self.replay, args=(channel,), daemon=True) for channel in channels]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+class AudioCaptureThread(QThread):
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str, str)
+    chunk_saved = pyqtSignal(str)
+
+    SAMPLE_RATE = 44100
+    CHANNELS = 2
+    SAMPLE_WIDTH = 2
+    BYTE_RATE = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+    SEGMENT_SECONDS = 60
+    PROBE_SECONDS = 1
+    PROBE_TIMEOUT = 4
+    SCRCPY_PROBE_TIMEOUT = 10  # scrcpy has to push and start its server before audio flows
+    SCRCPY_PROBE_BYTES = 4096
+    # name, exec-out arguments, bytes of container header ahead of the PCM data
+    METHODS = [
+        ("arecord", ["arecord", "-q", "-t", "raw", "-f", "cd"], 0),
+        ("tinycap", ["tinycap", "/proc/self/fd/1", "-c", "2", "-r", "44100", "-b", "16"], 44),
+    ]
+
+    def __init__(self, adb_path, device, base_path, duration=10, store=None):
+        super().__init__()
+        self.adb_path = adb_path
+        self.device = device
+        self.base_path = os.path.splitext(base_path)[0]
+        self.duration = duration  # 0 records until stopped
+        self.store = store
+        self.process = None
+        self.stopping = False
+        self.segment = 0
+
+    def stop(self):
+        self.stopping = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _check_probe(self, probe, header):
+        pcm = probe[header:]
+        head = probe[:128]
+        if head and sum(32 <= byte < 127 or byte in (9, 10, 13) for byte in head) > 0.9 * len(head):
+            return f"device reported: {head.decode('ascii', errors='replace').strip()}"
+        if len(pcm) < self.BYTE_RATE * self.PROBE_SECONDS / 2:
+            return f"stream too slow or empty ({len(pcm)} bytes in {self.PROBE_TIMEOUT}s)"
+        samples = array.array('h', pcm[:len(pcm) - len(pcm) % 2])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        peak = max(abs(sample) for sample in samples)
+        if peak == 0:
+            return "stream is silent (all samples zero) - capture is likely blocked"
+        rms = (sum(sample * sample for sample in samples) / len(samples)) ** 0.5
+        self.log_signal.emit(f"Audio {self.device}: s16le {self.SAMPLE_RATE} Hz stereo, peak {peak}, rms {rms:.0f}")
+        return None
+
+    def _finish_segment(self, wav, path):
+        wav.close()
+        self._save_chunk(path)
+
+    def _save_chunk(self, path):
+        if self.store is not None:
+            try:
+                self.store.put_file(path, self.device, "audio")
+                path = os.path.basename(path)
+            except (OSError, sqlite3.Error) as e:
+                self.log_signal.emit(f"Could not store {path}: {e}")
+        self.chunk_saved.emit(path)
+
+    def _stream(self, args, header):
+        self.process = subprocess.Popen([self.adb_path, "-s", self.device, "exec-out"] + args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        chunks = queue.Queue()
+
+        def reader():
+            for chunk in iter(lambda: self.process.stdout.read(16384), b''):
+                chunks.put(chunk)
+            chunks.put(None)
+
+        threading.Thread(target=reader, daemon=True).start()
+        probe = bytearray()
+        deadline = time.monotonic() + self.PROBE_TIMEOUT
+        while len(probe) < header + self.BYTE_RATE * self.PROBE_SECONDS and time.monotonic() < deadline:
+            try:
+                chunk = chunks.get(timeout=max(0.05, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if chunk is None:
+                chunks.put(None)
+                break
+            probe += chunk
+        error = self._check_probe(bytes(probe), header)
+        if error:
+            self.process.kill()
+            return error
+
+        segment_bytes = self.SEGMENT_SECONDS * self.BYTE_RATE
+        limit = self.duration * self.BYTE_RATE if self.duration else None
+        written, wav, path = 0, None, None
+        pending = bytes(probe[header:])
+        while pending is not None:
+            while pending:
+                if limit is not None and written >= limit:
+                    pending = b""
+                    self.stop()
+                    break
+                if wav is None:
+                    self.segment += 1
+                    path = f"{self.base_path}_part{self.segment:03d}.wav"
+                    wav = wave.open(path, 'wb')
+                    wav.setnchannels(self.CHANNELS)
+                    wav.setsampwidth(self.SAMPLE_WIDTH)
+                    wav.setframerate(self.SAMPLE_RATE)
+                room = segment_bytes - written % segment_bytes
+                if limit is not None:
+                    room = min(room, limit - written)
+                wav.writeframes(pending[:room])
+                written += min(room, len(pending))
+                pending = pending[room:]
+                if written % segment_bytes == 0 or written == limit:
+                    self._finish_segment(wav, path)
+                    wav = None
+            pending = chunks.get()
+        if wav is not None:
+            self._finish_segment(wav, path)
+        self.process.wait()
+        return None
+
+    def _scrcpy_segment(self, scrcpy_path, path, seconds):
+        cmd = [scrcpy_path, "-s", self.device, "--no-video", "--no-playback", "--audio-source=mic",
+               "--audio-codec=raw", "--record-format=wav", f"--record={path}", f"--time-limit={seconds}"]
+        if os.path.exists(path):
+            os.remove(path)
+        process = self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.extend(line.strip() for line in process.stderr), daemon=True)
+        reader.start()
+        deadline = time.monotonic() + self.SCRCPY_PROBE_TIMEOUT
+        while process.poll() is None and time.monotonic() < deadline and not self.stopping:
+            if os.path.exists(path) and os.path.getsize(path) >= self.SCRCPY_PROBE_BYTES:
+                break
+            time.sleep(0.2)
+        flowing = os.path.exists(path) and os.path.getsize(path) >= self.SCRCPY_PROBE_BYTES
+        if not flowing and not self.stopping:
+            process.kill()
+            process.wait()
+            reader.join(1)
+            if os.path.exists(path):
+                os.remove(path)
+            lines = [line for line in stderr if line]
+            return f"no audio within {self.SCRCPY_PROBE_TIMEOUT}s: {lines[-1] if lines else 'no output'}"
+        process.wait()
+        if os.path.exists(path) and os.path.getsize(path) > 44:
+            self._save_chunk(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        return None
+
+    def _scrcpy_capture(self):
+        scrcpy_path = os.path.join(sys._MEIPASS, "scrcpy.exe") if hasattr(sys, '_MEIPASS') else "scrcpy"
+        # scrcpy can only record to a file, so chunks are consecutive time-limited sessions
+        remaining = self.duration
+        while not self.stopping:
+            seconds = min(self.SEGMENT_SECONDS, remaining) if self.duration else self.SEGMENT_SECONDS
+            self.segment += 1
+            error = self._scrcpy_segment(scrcpy_path, f"{self.base_path}_part{self.segment:03d}.wav", seconds)
+            if error:
+                self.segment -= 1
+                if self.segment == 0:
+                    return error
+                self.log_signal.emit(f"Audio {self.device}: scrcpy stopped after {self.segment} chunk(s) - {error}")
+                break
+            if self.duration:
+                remaining -= seconds
+                if remaining <= 0:
+                    break
+        return None
+
+    def run(self):
+        errors = []
+        methods = [(name, lambda args=args, header=header: self._stream(args, header)) for name, args, header in self.METHODS]
+        methods.append(("scrcpy", self._scrcpy_capture))
+        for name, capture in methods:
+            if self.stopping:
+                break
+            try:
+                error = capture()
+            except FileNotFoundError as e:
+                error = f"not available ({e})"
+            if error is None:
+                self.log_signal.emit(f"Audio {self.device}: captured via {name} ({self.segment} chunk(s))")
+                self.status_signal.emit(f"Audio recorded ({self.device})", "green")
+                return
+            errors.append(f"{name}: {error}")
+            self.log_signal.emit(f"Audio {self.device}: {name} failed - {error}")
+        self.log_signal.emit(f"Audio recording failed on {self.device}: " + "; ".join(errors))
+        self.status_signal.emit("Audio recording failed", "red")
+
+class TriageThread(QThread):
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str, str)
+    output_signal = pyqtSignal(str)
+
+    # name, adb arguments, timeout in seconds
+    COLLECTORS = [
+        ("battery", ["shell", "dumpsys", "battery"], 20),
+        ("meminfo", ["shell", "dumpsys", "meminfo"], 45),
+        ("proc_meminfo", ["shell", "cat", "/proc/meminfo"], 10),
+        ("logcat", ["logcat", "-d"], 60),
+        ("build_prop", ["shell", "cat", "/system/build.prop"], 10),
+        ("packages", ["shell", "pm", "list", "packages", "-f"], 30),
+        ("ip_addr", ["shell", "ip", "addr"], 10),
+        ("location", ["shell", "dumpsys", "location"], 30),
+    ]
+    MAX_WORKERS = 16
+
+    def __init__(self, adb_path, devices, output_dir, store=None, search_index=None):
+        super().__init__()
+        self.adb_path = adb_path
+        self.devices = devices
+        self.output_dir = output_dir
+        self.store = store
+        self.search_index = search_index
+
+    def _collect(self, device, name, args, timeout):
+        started = time.monotonic()
+        entry = {"collector": name, "command": ["adb", "-s", device] + args, "timeout": timeout, "timed_out": False}
+        try:
+            result = subprocess.run([self.adb_path, "-s", device] + args, capture_output=True, timeout=timeout)
+            data, entry["returncode"] = result.stdout, result.returncode
+            if result.returncode != 0:
+                entry["error"] = result.stderr.decode('utf-8', errors='replace').strip()
+        except subprocess.TimeoutExpired as e:
+            data, entry["timed_out"], entry["returncode"] = e.stdout or b"", True, None
+        except OSError as e:
+            data, entry["returncode"], entry["error"] = b"", None, str(e)
+        entry["seconds"] = round(time.monotonic() - started, 3)
+        entry["bytes"] = len(data)
+        return device, entry, data
+
+    def run(self):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        bundles, indexes, remaining, report = {}, {}, {}, ["Triage Report:"]
+        try:
+            for device in self.devices:
+                path = os.path.join(self.output_dir, f"triage_{re.sub(r'[^A-Za-z0-9._-]', '_', device)}_{stamp}.zip")
+                bundles[device] = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+                indexes[device] = {"device": device, "created": stamp, "collectors": []}
+                remaining[device] = len(self.COLLECTORS)
+            workers = min(self.MAX_WORKERS, len(self.devices) * len(self.COLLECTORS))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self._collect, device, name, args, timeout)
+                           for device in self.devices for name, args, timeout in self.COLLECTORS]
+                for future in as_completed(futures):
+                    device, entry, data = future.result()
+                    entry["file"] = f"{entry['collector']}.txt"
+                    bundles[device].writestr(entry["file"], data)
+                    indexes[device]["collectors"].append(entry)
+                    if self.search_index is not None and data:
+                        self.search_index.add("triage", device, entry["collector"], data.decode('utf-8', errors='replace'))
+                    state = "timed out" if entry["timed_out"] else "ok" if entry["returncode"] == 0 else "failed"
+                    self.log_signal.emit(f"Triage {device}: {entry['collector']} {state} ({entry['seconds']}s)")
+                    remaining[device] -= 1
+                    if remaining[device] == 0:
+                        report.append(self._finish_bundle(device, bundles.pop(device), indexes[device]))
+            self.status_signal.emit(f"Triage complete ({len(self.devices)} device(s))", "green")
+        except Exception as e:
+            for bundle in bundles.values():
+                bundle.close()
+            self.log_signal.emit(f"Triage failed: {str(e)}")
+            self.status_signal.emit("Error: Triage failed!", "red")
+            report.append(f"Error: {str(e)}")
+        self.output_signal.emit("\n".join(report))
+
+    def _finish_bundle(self, device, bundle, index):
+        index["collectors"].sort(key=lambda entry: entry["collector"])
+        bundle.writestr("index.json", json.dumps(index, indent=2))
+        bundle.close()
+        path = bundle.filename
+        summary = ", ".join(f"{entry['collector']}={'timeout' if entry['timed_out'] else entry['returncode']}" for entry in index["collectors"])
+        if self.store is not None:
+            self.store.put_file(path, device, "triage")
+            return f"{device}: {os.path.basename(path)} stored ({summary})"
+        return f"{device}: {path} ({summary})"
+
+class SnapshotThread(QThread):
+    log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str, str)
+    output_signal = pyqtSignal(str)
+
+    SOURCES = {
+        "packages": ["shell", "pm", "list", "packages", "-f"],
+        "getprop": ["shell", "getprop"],
+        "package_dump": ["shell", "dumpsys", "package"],
+    }
+
+    def __init__(self, adb_path, devices, snapshots):
+        super().__init__()
+        self.adb_path = adb_path
+        self.devices = devices
+        self.snapshots = snapshots
+
+    def _snapshot(self, device):
+        outputs = {}
+        for name, args in self.SOURCES.items():
+            outputs[name] = adb_run([self.adb_path, "-s", device] + args, check=True, timeout=120).stdout
+        sections = self.snapshots.normalize(outputs["packages"], outputs["getprop"], outputs["package_dump"])
+        return self.snapshots.save(device, sections)
+
+    def run(self):
+        snapshot_ids, report = {}, []
+        with ThreadPoolExecutor(max_workers=max(1, min(16, len(self.devices)))) as pool:
+            futures = {pool.submit(self._snapshot, device): device for device in self.devices}
+            for future in as_completed(futures):
+                device = futures[future]
+                try:
+                    snapshot_ids[device] = future.result()
+                    self.log_signal.emit(f"Snapshot taken for {device}")
+                except Exception as e:
+                    self.log_signal.emit(f"Snapshot failed for {device}: {str(e)}")
+                    report.append(f"{device}: snapshot failed - {str(e)}")
+        try:
+            if len(self.devices) == 1 and snapshot_ids:
+                device, snapshot_id = next(iter(snapshot_ids.items()))
+                previous = self.snapshots.latest(device, before=snapshot_id)
+                if previous is None:
+                    report.insert(0, f"First snapshot for {device}; nothing to compare yet")
+                else:
+                    changes = self.snapshots.diff(previous, snapshot_id)
+                    report.insert(0, f"Changes on {device} since previous snapshot:")
+                    for name, section in changes.items():
+                        report.append(f"[{name}]")
+                        report.extend(f"  {kind}: {item}" for kind in ("added", "removed", "changed") for item in section[kind])
+                    if not changes:
+                        report.append("No changes")
+            elif snapshot_ids:
+                report.insert(0, self.snapshots.fleet_report(list(snapshot_ids.values())))
+            self.status_signal.emit("Snapshot report ready" if snapshot_ids else "Error: Snapshot failed!", "green" if snapshot_ids else "red")
+        except Exception as e:
+            self.log_signal.emit(f"Snapshot report failed: {str(e)}")
+            self.status_signal.emit("Error: Snapshot report failed!", "red")
+            report.append(f"Error: {str(e)}")
+        self.output_signal.emit("\n".join(report))
+
 class PleaseWaitDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -137,6 +2006,48 @@ class PleaseWaitDialog(QDialog):
         layout.addWidget(self.progress)
         self.setLayout(layout)
 
+class ArtifactBrowser(QDialog):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.setWindowTitle("Artifacts")
+        self.resize(600, 400)
+        layout = QVBoxLayout()
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Type:"))
+        self.action_filter = QComboBox()
+        self.action_filter.addItems(["All"] + store.actions())
+        self.action_filter.currentTextChanged.connect(self.refresh)
+        filter_row.addWidget(self.action_filter)
+        filter_row.addStretch()
+        layout.addLayout(filter_row)
+        self.artifact_list = QListWidget()
+        self.artifact_list.itemDoubleClicked.connect(self.export_selected)
+        layout.addWidget(self.artifact_list)
+        export_btn = QPushButton("Export", clicked=self.export_selected)
+        export_btn.setToolTip("Save the selected artifact under its original name")
+        layout.addWidget(export_btn)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        self.artifact_list.clear()
+        action = self.action_filter.currentText()
+        for record in self.store.list(action=None if action == "All" else action, limit=1000):
+            stamp = datetime.fromtimestamp(record["created"]).strftime('%Y-%m-%d %H:%M:%S')
+            item = QListWidgetItem(f"{stamp}  [{record['action']}]  {record['name']}  ({record['device'] or 'unknown'}, {record['size'] // 1024} KB)")
+            item.setData(Qt.ItemDataRole.UserRole, record["id"])
+            self.artifact_list.addItem(item)
+
+    def export_selected(self):
+        item = self.artifact_list.currentItem()
+        if item is None:
+            return
+        record = self.store.get(item.data(Qt.ItemDataRole.UserRole))
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export", record["name"])
+        if file_name:
+            self.store.export(record["id"], file_name)
+
 class ScreenshotViewer(QDialog):
     def __init__(self, image_path, parent=None):
         super().__init__(parent)
@@ -155,6 +2066,7 @@ class ADBSploitApp(QMainWindow):
     log_signal = pyqtSignal(str)
     status_signal = pyqtSignal(str, str)
     output_signal = pyqtSignal(str)
+    search_signal = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
@@ -174,8 +2086,17 @@ class ADBSploitApp(QMainWindow):
         self.connected_ip = ""
         self.output_dir = "output"
         os.makedirs(self.output_dir, exist_ok=True)
+        self.store = ArtifactStore(os.path.join(self.output_dir, "store"), lambda name, action, device: self.log_signal.emit(
+            f"Artifact store full or past retention: evicted {action} {name} ({device or 'unknown'})"))
+        self.snapshots = SnapshotStore(os.path.join(self.output_dir, "snapshots.db"))
+        self.search_index = SearchIndex(os.path.join(self.output_dir, "search.db"), datetime.now().strftime('%Y%m%d_%H%M%S'))
         self.scrcpy_process = None
         self.mirror_thread = None
+        self.record_thread = None
+        self.input_channels = {}
+        self.audio_threads = []
+        self.macro = None
+        self.macro_recording = False
 
         self.logo_designs = [
             r'''
@@ -224,6 +2145,7 @@ class ADBSploitApp(QMainWindow):
         self.log_signal.connect(self._log)
         self.status_signal.connect(self._set_status)
         self.output_signal.connect(self._set_output)
+        self.search_signal.connect(self._set_search_results)
 
         self.threads = []
         self.log_dock = None
@@ -238,6 +2160,17 @@ class ADBSploitApp(QMainWindow):
             self.scrcpy_process.terminate()
             self.scrcpy_process.wait()
             self.log_signal.emit("scrcpy process terminated on app close")
+        if self.record_thread and self.record_thread.isRunning():
+            self.record_thread.stop()
+        for thread in self.audio_threads:
+            if thread.isRunning():
+                thread.stop()
+        for channel in self.input_channels.values():
+            channel.close()
+        self.search_index.close()
+        if _broker_client is not None:
+            _broker_client.close()
+        shutdown_package_pool()
         for thread in self.threads:
             if thread.isRunning():
                 thread.quit()
@@ -248,6 +2181,7 @@ class ADBSploitApp(QMainWindow):
         self.set_icon()
         self.create_widgets()
         self.check_adb()
+        self.connect_broker()
         self.create_log_dock()
         self.update_log_display()
         self.splash.finish(self)
@@ -299,14 +2233,55 @@ class ADBSploitApp(QMainWindow):
 
         self.log_signal.emit("ADB not found. Please place adb.exe in the script directory or install it manually.")
 
+    def connect_broker(self):
+        global _broker_client
+        if not self.adb_path or not hasattr(socket, "AF_UNIX"):
+            return
+        try:
+            _broker_client = BrokerClient()
+            self.log_signal.emit(f"Using shared adb broker at {BROKER_SOCKET}" + ("" if _broker_client.trusted else
+                                 " (owned by another user: push, pull, install and connect run locally)"))
+            return
+        except OSError:
+            pass  # missing or stale socket; serve() replaces a stale one
+        args = [sys.executable] if hasattr(sys, '_MEIPASS') else [sys.executable, os.path.abspath(__file__)]
+        subprocess.Popen(args + ["--broker", self.adb_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        deadline = time.monotonic() + 3
+        error = None
+        while time.monotonic() < deadline:
+            try:
+                _broker_client = BrokerClient()
+                self.log_signal.emit(f"Using shared adb broker at {BROKER_SOCKET}")
+                return
+            except OSError as e:
+                error = e
+                time.sleep(0.1)
+        self.log_signal.emit(f"Shared adb broker unavailable ({str(error)}); running adb directly")
+
+    def restart_adb_server(self):
+        if _broker_client is None:
+            self.run_command([["adb", "kill-server"], ["adb", "start-server"]], "Server restarted", "Server restart failed")
+            return
+        try:
+            reply = _broker_client.restart()
+        except OSError as e:
+            reply = {"ok": False, "error": str(e)}
+        if reply["ok"]:
+            self.log_signal.emit("Server restarted by shared broker")
+            self.status_signal.emit("Server restarted", "green")
+        else:
+            self.log_signal.emit(f"Server restart refused: {reply['error']}")
+            self.status_signal.emit("Server restart refused", "red")
+
     def check_device_authorization(self, devices_output):
         if "unauthorized" in devices_output.lower():
             self.log_signal.emit("Device unauthorized. Please check your device for an authorization prompt or revoke USB debugging authorizations in Developer Options.")
         self.update_device_dropdown(devices_output)
 
-    def _log(self, message):
+    def _log(self, message, index_text=None):
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.log_entries.append(f"{timestamp} - {message}")
+        self.search_index.add("log", self.device_name, "log", message if index_text is None else index_text)
         self.update_log_display()
 
     def update_log_display(self):
@@ -321,18 +2296,43 @@ class ADBSploitApp(QMainWindow):
     def save_log(self):
         file_name, _ = QFileDialog.getSaveFileName(self, "Save Log", "", "Text Files (*.txt);;All Files (*)")
         if file_name:
-            with open(file_name, 'w', encoding='utf-8') as f:
-                f.write("\n".join(self.log_entries))
+            artifact_id = self.store.put_text("\n".join(self.log_entries), self.device_name, "log", os.path.basename(file_name))
+            self.store.export(artifact_id, file_name)
             self.log_signal.emit(f"Log saved to {file_name}")
 
     def _set_status(self, message, color):
         self.status_label.setText(message)
         self.status_label.setStyleSheet(f"color: {color}")
 
-    def _set_output(self, text):
+    def _set_output(self, text, device=None, action="output"):
         self.output_text.setPlainText(text)
+        self.search_index.add("output", self.device_name if device is None else device, action, text)
         self.output_text.verticalScrollBar().setValue(self.output_text.verticalScrollBar().maximum())
 
+    def run_search(self):
+        query = self.search_entry.text().strip()
+        if not query:
+            self.status_signal.emit("Error: Enter search terms!", "red")
+            return
+        device = self.device_name if self.search_device_only.isChecked() else None
+        threading.Thread(target=self._search_thread, args=(query, device), daemon=True).start()
+
+    def _search_thread(self, query, device):
+        started = time.monotonic()
+        try:
+            rows = self.search_index.search(query, device)
+        except sqlite3.Error as e:
+            self.search_signal.emit(f"Search failed: {str(e)}")
+            return
+        lines = [f"{len(rows)} match(es) in {time.monotonic() - started:.3f}s"]
+        for created, session, row_device, action, kind, text in rows:
+            stamp = datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S')
+            lines.append(f"{stamp} [{row_device or '-'}] {action} ({kind}, session {session}): {text}")
+        self.search_signal.emit("\n".join(lines))
+
+    def _set_search_results(self, text):
+        self.search_results.setPlainText(text)
+
     def browse_file(self, entry):
         file_name, _ = QFileDialog.getOpenFileName(self, "Select File")
         if file_name:
@@ -360,7 +2360,7 @@ class ADBSploitApp(QMainWindow):
             self.status_signal.emit(f"Connected to {self.device_name}", "green")
             self.connected_ip = self.device_name
             self.connection_status.setText(f"Connected to: {self.connected_ip}")
-            devices = subprocess.run([self.adb_path, "devices"], capture_output=True, text=True, encoding='utf-8', errors='replace').stdout
+            devices = adb_run([self.adb_path, "devices"]).stdout
             self.check_device_authorization(devices)
         except subprocess.CalledProcessError as e:
             self.log_signal.emit(f"Connection failed: {e.stderr}")
@@ -379,7 +2379,7 @@ class ADBSploitApp(QMainWindow):
             self.status_signal.emit("Disconnected", "green")
             self.connected_ip = ""
             self.connection_status.setText("Connected to: None")
-            devices = subprocess.run([self.adb_path, "devices"], capture_output=True, text=True, encoding='utf-8', errors='replace').stdout
+            devices = adb_run([self.adb_path, "devices"]).stdout
             self.update_device_dropdown(devices)
         except subprocess.CalledProcessError as e:
             self.log_signal.emit(f"Disconnect failed: {e.stderr}")
@@ -408,15 +2408,16 @@ class ADBSploitApp(QMainWindow):
             self.log_signal.emit(f"Failed to open shell: {str(e)}")
             self.status_signal.emit("Error: Shell failed!", "red")
 
-    def run_command(self, command, success_msg, error_msg, output_to_text=False):
+    def run_command(self, command, success_msg, error_msg, output_to_text=False, parser=None):
         if not self.adb_path and "adb" in command[0]:
             self.status_signal.emit("Error: ADB not configured!", "red")
             return
         self.status_signal.emit("Processing...", "yellow")
         self.progress.setVisible(True)
-        thread = WorkerThread(self.adb_path, command, success_msg, error_msg, output_to_text)
-        thread.result.connect(self._handle_command_result)
-        thread.output.connect(self._set_output)
+        thread = WorkerThread(self.adb_path, command, success_msg, error_msg, output_to_text, self.store, parser)
+        thread.result.connect(lambda message, status, success: self._handle_command_result(message, status, success, output_to_text))
+        device = command_device(command)
+        thread.output.connect(lambda text: self._set_output(text, device, success_msg))
         thread.finished.connect(lambda: self.progress.setVisible(False))
         thread.start()
         self.threads.append(thread)
@@ -428,8 +2429,11 @@ class ADBSploitApp(QMainWindow):
             return
         self.run_command(["adb", "-s", self.device_name, "shell", cmd], "Command executed", "Command failed", True)
 
-    def _handle_command_result(self, message, status, success):
-        self.log_signal.emit(message)
+    def _handle_command_result(self, message, status, success, output_indexed=False):
+        if success and output_indexed:
+            self._log(message, index_text=status)  # the output itself is indexed by _set_output
+        else:
+            self.log_signal.emit(message)
         self.status_signal.emit(status, "green" if success else "red")
 
     def start_screen_mirror(self):
@@ -445,10 +2449,10 @@ class ADBSploitApp(QMainWindow):
         self.mirror_thread = MirrorThread(self.adb_path, self.connected_ip)
         self.mirror_thread.log_signal.connect(self.log_signal)
         self.mirror_thread.status_signal.connect(self.status_signal)
-        self.mirror_thread.output_signal.connect(self._set_output)
+        self.mirror_thread.output_signal.connect(lambda text: self._set_output(text, action="mirror"))
         self.mirror_thread.finished.connect(wait_dialog.close)
+        self.mirror_thread.finished.connect(lambda: setattr(self, 'scrcpy_process', self.mirror_thread.scrcpy_process))
         self.mirror_thread.start()
-        self.scrcpy_process = self.mirror_thread.scrcpy_process
         self.threads.append(self.mirror_thread)
         self.log_signal.emit("Screen mirroring thread started")
 
@@ -469,6 +2473,14 @@ class ADBSploitApp(QMainWindow):
             self.device_dropdown.setCurrentText(self.connected_ip)
 
     def select_device(self, device):
+        if _broker_client is not None and device and device != "No devices detected":
+            try:
+                _broker_client.release()
+                reply = _broker_client.lease(device)
+                if not reply["ok"]:
+                    self.log_signal.emit(f"{reply['error']}; read-only commands still work")
+            except OSError as e:
+                self.log_signal.emit(f"Broker lease failed: {str(e)}")
         self.connected_ip = device
         self.device_name = device
         self.connection_status.setText(f"Connected to: {self.connected_ip}")
@@ -496,18 +2508,198 @@ class ADBSploitApp(QMainWindow):
             "Front camera opened", "Failed to open front camera"
         )
 
-    def record_audio(self):
+    def record_audio(self, all_devices=False):
         if not self.adb_path or not self.connected_ip:
             self.status_signal.emit("Error: No device connected!", "red")
             self.log_signal.emit("Audio recording failed: No device connected")
             return
-        duration = self.audio_time.text().strip() or "10"
-        output_file = os.path.join(self.output_dir, f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav")
-        self.run_command(
-            [["adb", "-s", self.device_name, "shell", "arecord", "-d", duration, "-f", "cd", "/sdcard/audio.wav"],
-             ["adb", "-s", self.device_name, "pull", "/sdcard/audio.wav", output_file]],
-            f"Audio recorded ({duration}s)", "Audio recording failed - device may not support audio recording via ADB without root or custom app"
-        )
+        try:
+            duration = int(self.audio_time.text().strip() or "10")
+        except ValueError:
+            self.status_signal.emit("Error: Invalid audio duration!", "red")
+            return
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        devices = self._dropdown_devices() if all_devices else [self.device_name]
+        if not devices:
+            self.status_signal.emit("Error: No devices detected!", "red")
+            return
+        for device in devices:
+            base_path = os.path.join(self.output_dir, f"audio_{re.sub(r'[^A-Za-z0-9._-]', '_', device)}_{stamp}.wav")
+            thread = AudioCaptureThread(self.adb_path, device, base_path, duration, self.store)
+            thread.log_signal.connect(self.log_signal)
+            thread.status_signal.connect(self.status_signal)
+            thread.chunk_saved.connect(lambda path, device=device: self.log_signal.emit(f"Audio chunk saved ({device}): {path} (see Artifacts)"))
+            thread.start()
+            self.threads.append(thread)
+            self.audio_threads.append(thread)
+        self.status_signal.emit("Recording audio...", "yellow")
+
+    def stop_audio(self):
+        running = [thread for thread in self.audio_threads if thread.isRunning()]
+        for thread in running:
+            thread.stop()
+        self.audio_threads = []
+        self.status_signal.emit("Audio recording stopped" if running else "No audio recording active", "green" if running else "yellow")
+
+    def _dropdown_devices(self):
+        return [self.device_dropdown.itemText(i) for i in range(self.device_dropdown.count())
+                if self.device_dropdown.itemText(i) != "No devices detected"]
+
+    def _input_result(self, device, label, error):
+        success_msg, error_msg = label
+        if error:
+            self.log_signal.emit(f"{error_msg} on {device}: {error}")
+            self.status_signal.emit(error_msg, "red")
+        else:
+            self.log_signal.emit(success_msg)
+            self.status_signal.emit(success_msg, "green")
+
+    def _input_channel(self, device):
+        channel = self.input_channels.get(device)
+        if channel is None:
+            channel = InputChannel(self.adb_path, device, lambda label, error, device=device: self._input_result(device, label, error))
+            self.input_channels[device] = channel
+        if self.macro_recording and device == self.device_name:
+            channel.recorder = self.macro
+        return channel
+
+    def _lease_input(self, device):
+        # input goes through its own forwarded monkey port, so the broker lease is checked here
+        if _broker_client is None:
+            return None
+        try:
+            reply = _broker_client.lease(device)
+        except OSError as e:
+            return f"Broker lease failed: {str(e)}"
+        return None if reply["ok"] else reply["error"]
+
+    def send_input(self, kind, args, success_msg, error_msg):
+        if not self.adb_path or not self.device_name:
+            self.status_signal.emit("Error: No device connected!", "red")
+            return
+        error = self._lease_input(self.device_name)
+        if error:
+            self.log_signal.emit(f"{error_msg}: {error}")
+            self.status_signal.emit(error_msg, "red")
+            return
+        try:
+            self._input_channel(self.device_name).send(kind, *args, label=(success_msg, error_msg))
+            self.status_signal.emit("Sending input...", "yellow")
+        except ValueError as e:
+            self.status_signal.emit(f"Error: {str(e)}", "red")
+
+    def send_custom_input(self):
+        parts = self.input_entry.text().split()
+        if not parts:
+            self.status_signal.emit("Error: Enter an input event!", "red")
+            return
+        kind = "keyevent" if parts[0] == "key" else parts[0]
+        self.send_input(kind, parts[1:], f"Input sent: {' '.join(parts)}", f"Failed to send input: {' '.join(parts)}")
+
+    def toggle_macro_recording(self):
+        if not self.macro_recording:
+            self.macro = InputMacro()
+            self.macro_recording = True
+            if self.device_name in self.input_channels:
+                self.input_channels[self.device_name].recorder = self.macro
+            self.macro_btn.setText("Stop Macro")
+            self.log_signal.emit("Macro recording started")
+        else:
+            self.macro_recording = False
+            for channel in self.input_channels.values():
+                channel.recorder = None
+            self.macro_btn.setText("Rec Macro")
+            file_name, _ = QFileDialog.getSaveFileName(self, "Save Macro", os.path.join(self.output_dir, "macro.json"), "Macro Files (*.json)")
+            if file_name:
+                self.macro.save(file_name)
+            self.log_signal.emit(f"Macro recorded ({len(self.macro.events)} events)")
+
+    def play_macro(self, all_devices=False):
+        if not self.adb_path:
+            self.status_signal.emit("Error: ADB not configured!", "red")
+            return
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load Macro", self.output_dir, "Macro Files (*.json);;All Files (*)")
+        if not file_name:
+            return
+        try:
+            macro = InputMacro.load(file_name)
+        except (OSError, ValueError, KeyError) as e:
+            self.status_signal.emit("Error: Invalid macro file!", "red")
+            self.log_signal.emit(f"Failed to load macro: {str(e)}")
+            return
+        channels = []
+        for device in (self._dropdown_devices() if all_devices else [self.device_name]):
+            if not device:
+                continue
+            error = self._lease_input(device)
+            if error:
+                self.log_signal.emit(f"Skipping macro on {device}: {error}")
+                continue
+            channels.append(self._input_channel(device))
+        threading.Thread(target=macro.replay_many, args=(channels,), daemon=True).start()
+        self.log_signal.emit(f"Replaying macro ({len(macro.events)} events) on {len(channels)} device(s)")
+        self.status_signal.emit("Macro replaying", "green")
+
+    def run_triage(self, all_devices=False):
+        if not self.adb_path or not self.connected_ip:
+            self.status_signal.emit("Error: No device connected!", "red")
+            return
+        devices = self._dropdown_devices() if all_devices else [self.device_name]
+        thread = TriageThread(self.adb_path, devices, self.output_dir, self.store, self.search_index)
+        thread.log_signal.connect(self.log_signal)
+        thread.status_signal.connect(self.status_signal)
+        thread.output_signal.connect(lambda text: self._set_output(text, action="triage"))
+        thread.start()
+        self.threads.append(thread)
+        self.status_signal.emit("Collecting triage bundle...", "yellow")
+        self.log_signal.emit(f"Triage started on {len(devices)} device(s)")
+
+    def run_snapshot(self, all_devices=False):
+        if not self.adb_path or not self.connected_ip:
+            self.status_signal.emit("Error: No device connected!", "red")
+            return
+        devices = self._dropdown_devices() if all_devices else [self.device_name]
+        if not devices:
+            self.status_signal.emit("Error: No devices detected!", "red")
+            return
+        thread = SnapshotThread(self.adb_path, devices, self.snapshots)
+        thread.log_signal.connect(self.log_signal)
+        thread.status_signal.connect(self.status_signal)
+        thread.output_signal.connect(lambda text: self._set_output(text, action="snapshot"))
+        thread.start()
+        self.threads.append(thread)
+        self.status_signal.emit("Taking snapshots...", "yellow")
+
+    def record_video(self):
+        if not self.adb_path or not self.connected_ip:
+            self.status_signal.emit("Error: No device connected!", "red")
+            self.log_signal.emit("Video recording failed: No device connected")
+            return
+        if self.record_thread and self.record_thread.isRunning():
+            self.status_signal.emit("Recording already in progress", "yellow")
+            return
+        try:
+            duration = int(self.record_time.text().strip() or "0")
+        except ValueError:
+            self.status_signal.emit("Error: Invalid video duration!", "red")
+            return
+        base_path = self.media_entry.text() or os.path.join(self.output_dir, f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
+        store = None if self.media_entry.text() else self.store
+        self.record_thread = ScreenRecordThread(self.adb_path, self.device_name, base_path, duration, store)
+        self.record_thread.log_signal.connect(self.log_signal)
+        self.record_thread.status_signal.connect(self.status_signal)
+        self.record_thread.segment_saved.connect(lambda path: self.log_signal.emit(f"Recording segment saved: {path} (see Artifacts)"))
+        self.record_thread.start()
+        self.threads.append(self.record_thread)
+        self.status_signal.emit("Recording...", "yellow")
+        self.log_signal.emit(f"Screen recording started ({duration}s)" if duration else "Screen recording started (until stopped)")
+
+    def stop_video(self):
+        if self.record_thread and self.record_thread.isRunning():
+            self.record_thread.stop()
+            self.log_signal.emit("Screen recording stop requested")
+        else:
+            self.status_signal.emit("No recording active", "yellow")
 
     def get_gps_info(self):
         if not self.adb_path or not self.connected_ip:
@@ -516,30 +2708,135 @@ class ADBSploitApp(QMainWindow):
             return
         self.run_command(
             ["adb", "-s", self.device_name, "shell", "dumpsys", "location"],
-            "GPS info retrieved", "Failed to get GPS info", True
+            "GPS info retrieved", "Failed to get GPS info", True, "location"
         )
 
+    def run_capture(self, command, action, name, success_msg, error_msg, export_path=None, on_done=None, validate=None):
+        if not self.adb_path or not self.connected_ip:
+            self.status_signal.emit("Error: No device connected!", "red")
+            return
+        self.status_signal.emit("Processing...", "yellow")
+        self.progress.setVisible(True)
+        command = [self.adb_path] + command[1:]
+        thread = CaptureThread(self.store, command, self.device_name, action, name, success_msg, error_msg, export_path, validate)
+        thread.result.connect(self._handle_command_result)
+        thread.finished.connect(lambda: self.progress.setVisible(False))
+        if on_done:
+            thread.finished.connect(on_done)
+        thread.start()
+        self.threads.append(thread)
+
+    def take_screenshot(self):
+        name = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        self.run_capture(["adb", "-s", self.device_name, "exec-out", "screencap", "-p"], "screenshot", name,
+                         "Screenshot saved", "Screenshot failed", self.media_entry.text() or None, self.update_screenshot_gallery, validate_png)
+
+    def pull_file(self):
+        remote_path = self.file_entry.text().strip()
+        if not remote_path:
+            self.status_signal.emit("Error: Enter a device path!", "red")
+            return
+        if not self.adb_path or not self.connected_ip:
+            self.status_signal.emit("Error: No device connected!", "red")
+            return
+        self.status_signal.emit("Processing...", "yellow")
+        self.progress.setVisible(True)
+        thread = PullThread(self.store, self.adb_path, self.device_name, remote_path)
+        thread.result.connect(self._handle_command_result)
+        thread.finished.connect(lambda: self.progress.setVisible(False))
+        thread.start()
+        self.threads.append(thread)
+
+    def show_artifacts(self):
+        browser = ArtifactBrowser(self.store, self)
+        browser.exec()
+
+    def _import_loose_screenshots(self):
+        for file in os.listdir(self.output_dir):
+            if file.startswith("screenshot_") and file.endswith(".png") and not self.store.contains("screenshot", file):
+                try:
+                    self.store.put_file(os.path.join(self.output_dir, file), "", "screenshot", file, move=False)
+                except (OSError, sqlite3.Error) as e:
+                    self.log_signal.emit(f"Could not import {file}: {e}")
+
     def update_screenshot_gallery(self):
         self.screenshot_list.clear()
-        for file in os.listdir(self.output_dir):
-            if file.startswith("screenshot_") and file.endswith(".png"):
-                self.screenshot_list.addItem(file)
+        for record in self.store.list(action="screenshot"):
+            item = QListWidgetItem(f"{record['name']} ({record['device'] or 'unknown'})")
+            item.setData(Qt.ItemDataRole.UserRole, record["id"])
+            self.screenshot_list.addItem(item)
 
     def show_screenshot(self, item):
-        file_path = os.path.join(self.output_dir, item.text())
+        file_path = self.store.get(item.data(Qt.ItemDataRole.UserRole))["path"]
         viewer = ScreenshotViewer(file_path, self)
         viewer.exec()
 
+    def export_artifact(self):
+        item = self.screenshot_list.currentItem()
+        if item is None:
+            self.status_signal.emit("Error: Select a screenshot!", "red")
+            return
+        record = self.store.get(item.data(Qt.ItemDataRole.UserRole))
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export", record["name"])
+        if file_name:
+            self.store.export(record["id"], file_name)
+            self.log_signal.emit(f"Exported {record['name']} to {file_name}")
+
     def flash_partition(self):
         file_name, _ = QFileDialog.getOpenFileName(self, "Select Image File", "", "Image Files (*.img);;All Files (*)")
         if file_name:
             partition, ok = QInputDialog.getText(self, "Partition Name", "Enter partition name (e.g., boot, system):")
             if ok and partition:
-                self.run_command(
+                self.run_fastboot_state_change(
                     ["fastboot", "flash", partition, file_name],
                     f"Partition {partition} flashed", "Failed to flash partition"
                 )
 
+    def flash_manifest(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Select Flash Manifest", "", "Manifest Files (*.json);;All Files (*)")
+        if not file_name:
+            return
+        dialog = FlashProgressDialog(self)
+        dialog.show()
+        thread = FlashThread(file_name, os.path.join(self.output_dir, "flash_cache.json"))
+        thread.log_signal.connect(self.log_signal)
+        thread.status_signal.connect(self.status_signal)
+        thread.progress_signal.connect(dialog.update_progress)
+        thread.output_signal.connect(lambda text: self._set_output(text, action="flash"))
+        thread.start()
+        self.threads.append(thread)
+        self.status_signal.emit("Flashing...", "yellow")
+
+    def run_fastboot_state_change(self, command, success_msg, error_msg):
+        invalidate_getvar()
+        self.run_command(command, success_msg, error_msg)
+        self.threads[-1].finished.connect(lambda: invalidate_getvar())
+
+    def show_fastboot_vars(self):
+        self.status_signal.emit("Processing...", "yellow")
+        threading.Thread(target=self._fastboot_vars_thread, daemon=True).start()
+
+    def _fastboot_vars_thread(self):
+        try:
+            serials = fastboot_serials()
+            if not serials:
+                raise ValueError("No devices in fastboot mode")
+            lines = []
+            for serial in serials:
+                record = fastboot_getvar(serial)
+                lines.append(f"[{serial}] current slot: {record['current_slot'] or 'n/a'}")
+                lines.extend(f"  {key}: {value}" for key, value in sorted(record["variables"].items()))
+                for partition, info in sorted(record["partitions"].items()):
+                    size = info.get("size")
+                    size = f"{size} bytes" if isinstance(size, int) else size or "?"
+                    lines.append(f"  partition {partition}: {info.get('type', '?')}, {size}")
+            self.output_signal.emit("\n".join(lines))
+            self.log_signal.emit(f"Device variables retrieved for {len(serials)} device(s)")
+            self.status_signal.emit("Device variables retrieved", "green")
+        except Exception as e:
+            self.log_signal.emit(f"Failed to get variables: {str(e)}")
+            self.status_signal.emit("Failed to get variables", "red")
+
     def create_log_dock(self):
         self.log_dock = QDockWidget("Log", self)
         self.log_dock.setAllowedAreas(Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
@@ -642,22 +2939,21 @@ class ADBSploitApp(QMainWindow):
         shell_btn = QPushButton("Shell", clicked=self.open_shell)
         shell_btn.setToolTip("Open ADB shell terminal")
         device_grid.addWidget(shell_btn, 1, 1)
-        restart_btn = QPushButton("Restart", clicked=lambda: self.run_command(
-            [["adb", "kill-server"], ["adb", "start-server"]], "Server restarted", "Server restart failed"))
-        restart_btn.setToolTip("Restart ADB server")
+        restart_btn = QPushButton("Restart", clicked=self.restart_adb_server)
+        restart_btn.setToolTip("Restart ADB server (refused while other operators hold device leases)")
         device_grid.addWidget(restart_btn, 1, 2)
         off_btn = QPushButton("Off", clicked=lambda: self.run_command(
             ["adb", "-s", self.device_name, "reboot"], "Device turned off", "Failed to turn off"))
         off_btn.setToolTip("Power off device")
         device_grid.addWidget(off_btn, 2, 0)
         battery_btn = QPushButton("Battery", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "shell", "dumpsys", "battery"], "Battery status retrieved", "Failed to get battery status", True))
+            ["adb", "-s", self.device_name, "shell", "dumpsys", "battery"], "Battery status retrieved", "Failed to get battery status", True, "battery"))
         battery_btn.setToolTip("Get battery status")
         device_grid.addWidget(battery_btn, 2, 1)
         dump_btn = QPushButton("Dump", clicked=lambda: self.run_command(
             [["adb", "-s", self.device_name, "shell", "dumpsys", "meminfo"],
              ["adb", "-s", self.device_name, "shell", "cat", "/proc/meminfo"]],
-            "System info dumped", "Failed to dump system info", True))
+            "System info dumped", "Failed to dump system info", True, "meminfo"))
         dump_btn.setToolTip("Dump system memory info")
         device_grid.addWidget(dump_btn, 2, 2)
         recovery_btn = QPushButton("Recovery", clicked=lambda: self.run_command(
@@ -676,16 +2972,13 @@ class ADBSploitApp(QMainWindow):
             ["adb", "-s", self.device_name, "logcat", "-d"], "Logcat retrieved", "Failed to get logcat", True))
         logcat_btn.setToolTip("Dump device logs")
         device_grid.addWidget(logcat_btn, 4, 0)
-        vol_up_btn = QPushButton("Vol Up", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "shell", "input", "keyevent", "24"], "Volume up sent", "Failed to send volume up"))
+        vol_up_btn = QPushButton("Vol Up", clicked=lambda: self.send_input("keyevent", [24], "Volume up sent", "Failed to send volume up"))
         vol_up_btn.setToolTip("Increase volume")
         device_grid.addWidget(vol_up_btn, 4, 1)
-        vol_down_btn = QPushButton("Vol Down", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "shell", "input", "keyevent", "25"], "Volume down sent", "Failed to send volume down"))
+        vol_down_btn = QPushButton("Vol Down", clicked=lambda: self.send_input("keyevent", [25], "Volume down sent", "Failed to send volume down"))
         vol_down_btn.setToolTip("Decrease volume")
         device_grid.addWidget(vol_down_btn, 4, 2)
-        power_btn = QPushButton("Key Power", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "shell", "input", "keyevent", "26"], "Power key sent", "Failed to send power key"))
+        power_btn = QPushButton("Key Power", clicked=lambda: self.send_input("keyevent", [26], "Power key sent", "Failed to send power key"))
         power_btn.setToolTip("Simulate power button")
         device_grid.addWidget(power_btn, 5, 0)
         dev_info_btn = QPushButton("Device Info", clicked=lambda: self.run_command(
@@ -695,6 +2988,35 @@ class ADBSploitApp(QMainWindow):
         root_btn = QPushButton("Check Root", clicked=self.check_root)
         root_btn.setToolTip("Check if device is rooted")
         device_grid.addWidget(root_btn, 5, 2)
+        device_grid.addWidget(QLabel("Input:"), 6, 0)
+        self.input_entry = QLineEdit()
+        self.input_entry.setToolTip("e.g., key 3, tap 500 800, swipe 500 1500 500 300 200")
+        self.input_entry.setMaximumWidth(150)
+        device_grid.addWidget(self.input_entry, 6, 1)
+        send_input_btn = QPushButton("Send", clicked=self.send_custom_input)
+        send_input_btn.setToolTip("Send a key, tap or swipe over the persistent input channel")
+        device_grid.addWidget(send_input_btn, 6, 2)
+        self.macro_btn = QPushButton("Rec Macro", clicked=self.toggle_macro_recording)
+        self.macro_btn.setToolTip("Record input events with their timing")
+        device_grid.addWidget(self.macro_btn, 7, 0)
+        play_macro_btn = QPushButton("Play Macro", clicked=lambda: self.play_macro())
+        play_macro_btn.setToolTip("Replay a saved macro on the selected device")
+        device_grid.addWidget(play_macro_btn, 7, 1)
+        play_all_btn = QPushButton("Play on All", clicked=lambda: self.play_macro(True))
+        play_all_btn.setToolTip("Replay a saved macro on every listed device at once")
+        device_grid.addWidget(play_all_btn, 7, 2)
+        triage_btn = QPushButton("Triage", clicked=lambda: self.run_triage())
+        triage_btn.setToolTip("Collect battery, memory, logcat, properties, apps, IP and GPS into one bundle")
+        device_grid.addWidget(triage_btn, 8, 0)
+        triage_all_btn = QPushButton("Triage All", clicked=lambda: self.run_triage(True))
+        triage_all_btn.setToolTip("Collect a triage bundle from every listed device in parallel")
+        device_grid.addWidget(triage_all_btn, 8, 1)
+        snapshot_btn = QPushButton("Snapshot", clicked=lambda: self.run_snapshot())
+        snapshot_btn.setToolTip("Snapshot packages, permissions and properties and diff against the previous snapshot")
+        device_grid.addWidget(snapshot_btn, 8, 2)
+        fleet_diff_btn = QPushButton("Fleet Diff", clicked=lambda: self.run_snapshot(True))
+        fleet_diff_btn.setToolTip("Snapshot every listed device and report how they differ")
+        device_grid.addWidget(fleet_diff_btn, 9, 0)
         device_layout.addLayout(device_grid)
         device_layout.addStretch()
         tabs.addTab(device_tab, "📱")
@@ -735,7 +3057,7 @@ class ADBSploitApp(QMainWindow):
         list_apps_btn.setToolTip("List installed apps")
         apps_grid.addWidget(list_apps_btn, 2, 0)
         perms_btn = QPushButton("Permissions", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "shell", "dumpsys", "package", self.package_entry.text()], "Permissions listed", "Failed to list permissions", True))
+            ["adb", "-s", self.device_name, "shell", "dumpsys", "package", self.package_entry.text()], "Permissions listed", "Failed to list permissions", True, "package"))
         perms_btn.setToolTip("List app permissions")
         apps_grid.addWidget(perms_btn, 2, 1)
         apps_layout.addLayout(apps_grid)
@@ -756,30 +3078,30 @@ class ADBSploitApp(QMainWindow):
         media_browse_btn = QPushButton("Browse", clicked=lambda: self.browse_save(self.media_entry))
         media_browse_btn.setToolTip("Select save location")
         media_grid.addWidget(media_browse_btn, 0, 2)
-        screenshot_btn = QPushButton("Screenshot", clicked=lambda: self.run_command(
-            [["adb", "-s", self.device_name, "shell", "screencap", "/sdcard/screen.png"],
-             ["adb", "-s", self.device_name, "pull", "/sdcard/screen.png", self.media_entry.text() or os.path.join(self.output_dir, f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")]],
-            "Screenshot saved", "Screenshot failed") and self.update_screenshot_gallery())
+        screenshot_btn = QPushButton("Screenshot", clicked=self.take_screenshot)
         screenshot_btn.setToolTip("Capture device screenshot")
         media_grid.addWidget(screenshot_btn, 0, 3)
         media_grid.addWidget(QLabel("Vid Time(s):"), 1, 0)
         self.record_time = QLineEdit("180")
-        self.record_time.setToolTip("Video recording duration in seconds (max 180)")
+        self.record_time.setToolTip("Video recording duration in seconds (0 = until stopped)")
         self.record_time.setMaximumWidth(50)
         media_grid.addWidget(self.record_time, 1, 1)
-        record_video_btn = QPushButton("Record Video", clicked=lambda: self.run_command(
-            [["adb", "-s", self.device_name, "shell", "screenrecord", f"--time-limit={self.record_time.text()}", "/sdcard/demo.mp4"],
-             ["adb", "-s", self.device_name, "pull", "/sdcard/demo.mp4", self.media_entry.text() or os.path.join(self.output_dir, f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")]],
-            f"Video recorded ({self.record_time.text()}s)", "Video recording failed"))
-        record_video_btn.setToolTip("Record device screen")
-        media_grid.addWidget(record_video_btn, 1, 3)
+        record_video_btn = QPushButton("Record Video", clicked=self.record_video)
+        record_video_btn.setToolTip("Record device screen straight to the host in segments")
+        media_grid.addWidget(record_video_btn, 1, 2)
+        stop_video_btn = QPushButton("Stop Video", clicked=self.stop_video)
+        stop_video_btn.setToolTip("Stop the current screen recording")
+        media_grid.addWidget(stop_video_btn, 1, 3)
         media_grid.addWidget(QLabel("Aud Time(s):"), 2, 0)
         self.audio_time = QLineEdit("10")
-        self.audio_time.setToolTip("Audio recording duration in seconds")
+        self.audio_time.setToolTip("Audio recording duration in seconds (0 = until stopped)")
         self.audio_time.setMaximumWidth(50)
         media_grid.addWidget(self.audio_time, 2, 1)
-        record_audio_btn = QPushButton("Record Audio", clicked=self.record_audio)
-        record_audio_btn.setToolTip("Record audio from microphone")
+        record_audio_all_btn = QPushButton("Audio All", clicked=lambda: self.record_audio(True))
+        record_audio_all_btn.setToolTip("Record audio from every listed device at once")
+        media_grid.addWidget(record_audio_all_btn, 2, 2)
+        record_audio_btn = QPushButton("Record Audio", clicked=lambda: self.record_audio())
+        record_audio_btn.setToolTip("Record audio from microphone, streamed to the host in chunks")
         media_grid.addWidget(record_audio_btn, 2, 3)
         mirror_btn = QPushButton("Mirror", clicked=self.start_screen_mirror)
         mirror_btn.setToolTip("Start screen mirroring (requires scrcpy)")
@@ -797,6 +3119,16 @@ class ADBSploitApp(QMainWindow):
         self.screenshot_list.setToolTip("Recent screenshots - click to view")
         self.screenshot_list.itemClicked.connect(self.show_screenshot)
         media_grid.addWidget(self.screenshot_list, 4, 0, 1, 4)
+        export_btn = QPushButton("Export", clicked=self.export_artifact)
+        export_btn.setToolTip("Export the selected screenshot from the artifact store")
+        media_grid.addWidget(export_btn, 5, 3)
+        stop_audio_btn = QPushButton("Stop Audio", clicked=self.stop_audio)
+        stop_audio_btn.setToolTip("Stop all running audio recordings")
+        media_grid.addWidget(stop_audio_btn, 5, 0)
+        artifacts_btn = QPushButton("Artifacts", clicked=self.show_artifacts)
+        artifacts_btn.setToolTip("Browse and export recordings, audio, pulls, triage bundles and outputs")
+        media_grid.addWidget(artifacts_btn, 5, 2)
+        self._import_loose_screenshots()
         self.update_screenshot_gallery()
         media_layout.addLayout(media_grid)
         media_layout.addStretch()
@@ -817,11 +3149,12 @@ class ADBSploitApp(QMainWindow):
             ["adb", "-s", self.device_name, "shell", "ls", self.file_entry.text() or "/sdcard"], "Files listed", "Failed to list files", True))
         list_files_btn.setToolTip("List files in directory")
         file_grid.addWidget(list_files_btn, 0, 2)
-        pull_btn = QPushButton("Pull", clicked=lambda: self.run_command(
-            ["adb", "-s", self.device_name, "pull", self.file_entry.text(), os.path.join(self.output_dir, os.path.basename(self.file_entry.text()))],
-            "File pulled", "Failed to pull file"))
+        pull_btn = QPushButton("Pull", clicked=self.pull_file)
         pull_btn.setToolTip("Download file from device")
         file_grid.addWidget(pull_btn, 0, 3)
+        file_artifacts_btn = QPushButton("Artifacts", clicked=self.show_artifacts)
+        file_artifacts_btn.setToolTip("Browse and export pulled files")
+        file_grid.addWidget(file_artifacts_btn, 2, 3)
         file_grid.addWidget(QLabel("Push:"), 1, 0)
         self.push_entry = QLineEdit()
         self.push_entry.setToolTip("Local file to push to device")
@@ -851,17 +3184,17 @@ class ADBSploitApp(QMainWindow):
         fastboot_devices_btn.setToolTip("List devices in fastboot mode")
         fastboot_grid.addWidget(fastboot_devices_btn, 0, 0)
 
-        fastboot_reboot_btn = QPushButton("Restart Device", clicked=lambda: self.run_command(
+        fastboot_reboot_btn = QPushButton("Restart Device", clicked=lambda: self.run_fastboot_state_change(
             ["fastboot", "reboot"], "Device rebooted", "Failed to reboot device"))
         fastboot_reboot_btn.setToolTip("Restart the device to normal mode")
         fastboot_grid.addWidget(fastboot_reboot_btn, 0, 1)
 
-        recovery_btn = QPushButton("Recovery", clicked=lambda: self.run_command(
+        recovery_btn = QPushButton("Recovery", clicked=lambda: self.run_fastboot_state_change(
             ["fastboot", "reboot", "recovery"], "Rebooted to recovery", "Failed to reboot to recovery"))
         recovery_btn.setToolTip("Reboot device to recovery mode")
         fastboot_grid.addWidget(recovery_btn, 0, 2)
 
-        bootloader_btn = QPushButton("Bootloader", clicked=lambda: self.run_command(
+        bootloader_btn = QPushButton("Bootloader", clicked=lambda: self.run_fastboot_state_change(
             ["fastboot", "reboot-bootloader"], "Rebooted to bootloader", "Failed to reboot to bootloader"))
         bootloader_btn.setToolTip("Reboot device to bootloader mode")
         fastboot_grid.addWidget(bootloader_btn, 1, 0)
@@ -870,21 +3203,44 @@ class ADBSploitApp(QMainWindow):
         flash_btn.setToolTip("Flash a partition with an image file")
         fastboot_grid.addWidget(flash_btn, 1, 1)
 
-        getvar_btn = QPushButton("Getvar", clicked=lambda: self.run_command(
-            ["fastboot", "getvar", "all"], "Device variables retrieved", "Failed to get variables", True))
+        getvar_btn = QPushButton("Getvar", clicked=self.show_fastboot_vars)
         getvar_btn.setToolTip("Get all fastboot variables")
         fastboot_grid.addWidget(getvar_btn, 1, 2)
 
-        oem_unlock_btn = QPushButton("OEM Unlock", clicked=lambda: self.run_command(
+        oem_unlock_btn = QPushButton("OEM Unlock", clicked=lambda: self.run_fastboot_state_change(
             ["fastboot", "oem", "unlock"], "OEM unlocked", "Failed to unlock OEM (may already be unlocked or not supported)"))
         oem_unlock_btn.setToolTip("Unlock the bootloader (warning: wipes data)")
         fastboot_grid.addWidget(oem_unlock_btn, 2, 0)
 
+        flash_manifest_btn = QPushButton("Flash Manifest", clicked=self.flash_manifest)
+        flash_manifest_btn.setToolTip("Flash every partition in a JSON manifest on all fastboot devices")
+        fastboot_grid.addWidget(flash_manifest_btn, 2, 1)
+
         fastboot_layout.addLayout(fastboot_grid)
         fastboot_layout.addStretch()
         tabs.addTab(fastboot_tab, "⚡")
         tabs.setTabToolTip(5, "Fastboot mode controls")
 
+        # Search Tab
+        search_tab = QWidget()
+        search_layout = QVBoxLayout(search_tab)
+        search_bar = QHBoxLayout()
+        self.search_entry = QLineEdit()
+        self.search_entry.setToolTip("Search logs and command outputs from every session")
+        self.search_entry.returnPressed.connect(self.run_search)
+        search_bar.addWidget(self.search_entry)
+        self.search_device_only = QCheckBox("Selected device only")
+        search_bar.addWidget(self.search_device_only)
+        search_btn = QPushButton("Search", clicked=self.run_search)
+        search_btn.setToolTip("Search the log and output index")
+        search_bar.addWidget(search_btn)
+        search_layout.addLayout(search_bar)
+        self.search_results = QTextEdit()
+        self.search_results.setReadOnly(True)
+        search_layout.addWidget(self.search_results)
+        tabs.addTab(search_tab, "🔎")
+        tabs.setTabToolTip(6, "Search logs and outputs across sessions")
+
         # Output Tab
         output_tab = QWidget()
         output_layout = QVBoxLayout(output_tab)
@@ -894,7 +3250,7 @@ class ADBSploitApp(QMainWindow):
         output_layout.addWidget(QLabel("Output:"))
         output_layout.addWidget(self.output_text)
         tabs.addTab(output_tab, "📋")
-        tabs.setTabToolTip(6, "View command outputs")
+        tabs.setTabToolTip(7, "View command outputs")
 
         # Status and Progress
         status_layout = QHBoxLayout()
@@ -919,6 +3275,11 @@ class ADBSploitApp(QMainWindow):
         main_layout.addLayout(footer_layout)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if "--broker" in sys.argv:
+        index = sys.argv.index("--broker")
+        AdbBroker(sys.argv[index + 1] if len(sys.argv) > index + 1 else "adb").serve()
+        sys.exit(0)
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = ADBSploitApp()
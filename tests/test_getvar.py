@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt6")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from adbsploit import parse_getvar
+
+SPACED = """(bootloader) version-bootloader: abc-1.0
+(bootloader) current-slot: b
+(bootloader) partition-size:boot_a: 0x4000000
+(bootloader) partition-type:boot_a: raw
+all:
+Finished. Total time: 0.012s
+"""
+
+# LK/aboot and Pixel bootloaders print no space after the colon
+COLON_ONLY = """(bootloader) version-bootloader:b1c1-0.4-7617406
+(bootloader) current-slot:a
+(bootloader) partition-size:boot_a:0x4000000
+(bootloader) partition-type:boot_a:raw
+(bootloader) is-logical:system_a:yes
+(bootloader) slot-retry-count:a:3
+all:
+Finished. Total time: 0.150s
+"""
+
+def test_spaced_format():
+    record = parse_getvar(SPACED)
+    assert record["variables"]["version-bootloader"] == "abc-1.0"
+    assert record["current_slot"] == "b"
+    assert record["partitions"]["boot_a"] == {"size": 0x4000000, "type": "raw"}
+
+def test_colon_only_format():
+    record = parse_getvar(COLON_ONLY)
+    assert record["variables"]["version-bootloader"] == "b1c1-0.4-7617406"
+    assert record["current_slot"] == "a"
+    assert record["partitions"]["boot_a"] == {"size": 0x4000000, "type": "raw"}
+    assert record["variables"]["is-logical:system_a"] == "yes"
+    assert record["variables"]["slot-retry-count:a"] == "3"
+    assert "all" not in record["variables"]